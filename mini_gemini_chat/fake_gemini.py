@@ -0,0 +1,167 @@
+"""
+    Lokalny fake klienta google-genai do testów i load testów mini_gemini_chat.
+
+    Udaje tę część API, z której korzysta aplikacja: client.chats.create,
+    client.aio.chats.create (send_message, send_message_stream, get_history,
+    record_history) oraz client.models.generate_content. Odpowiedzi są deterministyczne
+    (zależą od pytania), a czas odpowiedzi to opóźnienie pierwszego tokenu plus
+    liczba tokenów podzielona przez tempo generowania - bez sieci i bez klucza API.
+
+    Parametry z env (lub argumentów FakeClient):
+      FAKE_GEMINI_LATENCY_MS       opóźnienie pierwszego tokenu (domyślnie 300)
+      FAKE_GEMINI_TOKENS_PER_S     tempo generowania (domyślnie 80, 0 = natychmiast)
+      FAKE_GEMINI_REPLY_TOKENS     długość odpowiedzi w tokenach (domyślnie 60)
+      FAKE_GEMINI_CHUNK_TOKENS     tokenów w jednym fragmencie strumienia (domyślnie 4)
+
+    GEMINI_BACKEND=fake uvicorn mini_gemini_chat:app
+    python mini_gemini_chat.py --cli --fake
+"""
+
+from __future__ import annotations
+import asyncio
+import os
+import time
+import zlib
+from typing import List, Optional
+
+from google.genai import types
+
+_WORDS = ("naleśniki", "mąka", "mleko", "jajka", "szczypta", "soli", "patelnia", "ciasto",
+          "smażyć", "minuty", "z", "każdej", "strony", "podawać", "na", "ciepło", "z", "dżemem")
+
+
+def _reply_tokens(prompt: str, n: int) -> List[str]:
+    """Deterministyczna odpowiedź: te same pytanie i długość dają ten sam tekst."""
+    seed = zlib.crc32(prompt.encode("utf-8"))
+    return [_WORDS[(seed + i * 7) % len(_WORDS)] + " " for i in range(n)]
+
+
+def _usage(prompt: str, n: int) -> types.GenerateContentResponseUsageMetadata:
+    prompt_tokens = len(prompt) // 4 + 1
+    return types.GenerateContentResponseUsageMetadata(
+        prompt_token_count=prompt_tokens, candidates_token_count=n, total_token_count=prompt_tokens + n)
+
+
+class FakeResponse:
+    def __init__(self, text: str, usage_metadata=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+class _FakeChatBase:
+    def __init__(self, backend: "FakeClient", model: str, history: Optional[List[types.Content]] = None, config=None):
+        self._backend = backend
+        self._model = model
+        self._config = config
+        self._history: List[types.Content] = list(history or [])
+
+    def get_history(self, curated: bool = False) -> List[types.Content]:
+        return list(self._history)
+
+    def record_history(self, user_input: types.Content, model_output: List[types.Content], is_valid: bool) -> None:
+        self._history.append(user_input)
+        self._history.extend(model_output or [types.Content(role="model", parts=[])])
+
+    def _record(self, message: str, reply: str) -> None:
+        self.record_history(
+            types.Content(role="user", parts=[types.Part(text=message)]),
+            [types.Content(role="model", parts=[types.Part(text=reply)])],
+            True,
+        )
+
+
+class FakeChat(_FakeChatBase):
+    def send_message(self, message: str, config=None) -> FakeResponse:
+        b = self._backend
+        tokens = _reply_tokens(message, b.reply_tokens)
+        time.sleep(b.latency + b.generation_time(len(tokens)))
+        reply = "".join(tokens).strip()
+        self._record(message, reply)
+        b.calls += 1
+        return FakeResponse(reply, _usage(message, len(tokens)))
+
+
+class FakeAsyncChat(_FakeChatBase):
+    async def send_message(self, message: str, config=None) -> FakeResponse:
+        b = self._backend
+        tokens = _reply_tokens(message, b.reply_tokens)
+        await asyncio.sleep(b.latency + b.generation_time(len(tokens)))
+        reply = "".join(tokens).strip()
+        self._record(message, reply)
+        b.calls += 1
+        return FakeResponse(reply, _usage(message, len(tokens)))
+
+    async def send_message_stream(self, message: str, config=None):
+        b = self._backend
+        tokens = _reply_tokens(message, b.reply_tokens)
+
+        async def chunks():
+            await asyncio.sleep(b.latency)
+            out = []
+            step = max(1, b.chunk_tokens)
+            for i in range(0, len(tokens), step):
+                part = tokens[i:i + step]
+                if i:
+                    await asyncio.sleep(b.generation_time(len(part)))
+                out.extend(part)
+                last = i + step >= len(tokens)
+                yield FakeResponse("".join(part), _usage(message, len(tokens)) if last else None)
+            # jak w google-genai: tura trafia do historii dopiero po odebraniu całego strumienia
+            self._record(message, "".join(out).strip())
+            b.calls += 1
+
+        return chunks()
+
+
+class _Chats:
+    def __init__(self, backend: "FakeClient", chat_cls):
+        self._backend = backend
+        self._chat_cls = chat_cls
+
+    def create(self, *, model: str, history=None, config=None):
+        return self._chat_cls(self._backend, model, history, config)
+
+
+class _Models:
+    def __init__(self, backend: "FakeClient"):
+        self._backend = backend
+
+    def generate_content(self, *, model: str, contents, config=None) -> FakeResponse:
+        b = self._backend
+        prompt = contents if isinstance(contents, str) else str(contents)
+        tokens = _reply_tokens(prompt, b.reply_tokens)
+        time.sleep(b.latency + b.generation_time(len(tokens)))
+        b.calls += 1
+        return FakeResponse("".join(tokens).strip(), _usage(prompt, len(tokens)))
+
+
+class _Aio:
+    def __init__(self, backend: "FakeClient"):
+        self.chats = _Chats(backend, FakeAsyncChat)
+
+
+class FakeClient:
+    """Zamiennik genai.Client o konfigurowalnym opóźnieniu i tempie generowania tokenów."""
+
+    def __init__(self, latency_ms: float = 300, tokens_per_s: float = 80, reply_tokens: int = 60,
+                 chunk_tokens: int = 4):
+        self.latency = latency_ms / 1000
+        self.tokens_per_s = tokens_per_s
+        self.reply_tokens = reply_tokens
+        self.chunk_tokens = chunk_tokens
+        self.calls = 0
+        self.chats = _Chats(self, FakeChat)
+        self.aio = _Aio(self)
+        self.models = _Models(self)
+
+    @classmethod
+    def from_env(cls) -> "FakeClient":
+        return cls(
+            latency_ms=float(os.getenv("FAKE_GEMINI_LATENCY_MS", "300")),
+            tokens_per_s=float(os.getenv("FAKE_GEMINI_TOKENS_PER_S", "80")),
+            reply_tokens=int(os.getenv("FAKE_GEMINI_REPLY_TOKENS", "60")),
+            chunk_tokens=int(os.getenv("FAKE_GEMINI_CHUNK_TOKENS", "4")),
+        )
+
+    def generation_time(self, n_tokens: int) -> float:
+        return n_tokens / self.tokens_per_s if self.tokens_per_s > 0 else 0.0
@@ -0,0 +1,210 @@
+"""
+    Load test mini_gemini_chat: wiele równoległych sesji wysyła tury do /chat
+    (albo /chat/stream) i co jakiś czas /clear.
+
+    Domyślnie aplikacja działa w tym samym procesie (httpx.ASGITransport) z lokalnym
+    fake backendem (fake_gemini.py), a sessions/ i cache/ trafiają do katalogu tymczasowego -
+    nie zużywa limitów API i nie dotyka prawdziwych sesji. Z --url test idzie do działającego
+    serwera (np. GEMINI_BACKEND=fake uvicorn mini_gemini_chat:app).
+
+    Raport: p50/p95/p99 opóźnień dla każdego endpointu (dla strumienia także czas do
+    pierwszego fragmentu), przepustowość, kody odpowiedzi (429 = odrzucone przez kolejkę,
+    sse_error = strumień 200 zakończony zdarzeniem error)
+    oraz przyrost pamięci (RSS serwera z /metrics) i stan magazynu sesji.
+    W trybie lokalnym ASGITransport buforuje całą odpowiedź, więc czas do pierwszego
+    fragmentu strumienia jest miarodajny tylko z --url.
+
+    python load_test.py --sessions 200 --turns 5 --concurrency 50
+    python load_test.py --stream --latency-ms 500 --tokens-per-s 40 --json wynik.json
+    python load_test.py --url http://127.0.0.1:8000 --sessions 1000 --concurrency 100
+"""
+
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Union
+
+import httpx
+
+PROMPTS = (
+    "podaj przepis na naleśniki",
+    "jak ugotować makaron al dente?",
+    "streść mi zasady gry w szachy",
+    "co warto zobaczyć w Krakowie?",
+    "napisz krótki wiersz o jesieni",
+    "jaka jest różnica między listą a krotką w Pythonie?",
+)
+
+
+def percentile(sorted_vals: List[float], q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    return sorted_vals[min(len(sorted_vals) - 1, int(q * len(sorted_vals)))]
+
+
+class Recorder:
+    def __init__(self):
+        self.latency: Dict[str, List[float]] = defaultdict(list)
+        self.status: Dict[str, Counter] = defaultdict(Counter)
+
+    def record(self, name: str, seconds: float, status: Union[int, str]) -> None:
+        self.status[name][status] += 1
+        if status == 200:
+            self.latency[name].append(seconds)
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        out = {}
+        for name in sorted(self.status):
+            vals = sorted(self.latency[name])
+            total = sum(self.status[name].values())
+            out[name] = {
+                "requests": total,
+                "ok": len(vals),
+                "status": dict(self.status[name]),
+                "req_per_s": total / elapsed if elapsed else 0.0,
+                "p50_ms": percentile(vals, 0.50) * 1000,
+                "p95_ms": percentile(vals, 0.95) * 1000,
+                "p99_ms": percentile(vals, 0.99) * 1000,
+                "max_ms": vals[-1] * 1000 if vals else 0.0,
+            }
+        return out
+
+
+async def chat_turn(client: httpx.AsyncClient, rec: Recorder, sid: str, message: str, stream: bool) -> None:
+    body = {"session_id": sid, "message": message, "include_turns": False}
+    t0 = time.perf_counter()
+    if not stream:
+        r = await client.post("/chat", json=body)
+        rec.record("chat", time.perf_counter() - t0, r.status_code)
+        return
+    async with client.stream("POST", "/chat/stream", json=body) as r:
+        first = None
+        status: Union[int, str] = r.status_code
+        async for line in r.aiter_lines():
+            if first is None and line.startswith("event: delta"):
+                first = time.perf_counter() - t0
+            if line.startswith("event: error"):
+                # błąd modelu w trakcie strumienia - nagłówki poszły już z kodem 200
+                status = "sse_error"
+        rec.record("chat_stream", time.perf_counter() - t0, status)
+        if first is not None:
+            rec.record("chat_stream_ttfb", first, status)
+
+
+async def run_session(client: httpx.AsyncClient, rec: Recorder, idx: int, args, rng: random.Random,
+                      gate: asyncio.Semaphore) -> None:
+    sid = f"load-{args.run_id}-{idx}"
+    async with gate:
+        for _ in range(args.turns):
+            await chat_turn(client, rec, sid, rng.choice(PROMPTS), args.stream)
+            if rng.random() < args.clear_ratio:
+                t0 = time.perf_counter()
+                r = await client.post("/clear", json={"session_id": sid})
+                rec.record("clear", time.perf_counter() - t0, r.status_code)
+
+
+async def server_metrics(client: httpx.AsyncClient) -> Dict[str, Any]:
+    r = await client.get("/metrics")
+    return r.json() if r.status_code == 200 else {}
+
+
+async def run(args) -> Dict[str, Any]:
+    if args.url:
+        transport, base_url = None, args.url
+    else:
+        import mini_gemini_chat as app_module
+        from fake_gemini import FakeClient
+        app_module.set_client(FakeClient(args.latency_ms, args.tokens_per_s, args.reply_tokens))
+        transport, base_url = httpx.ASGITransport(app=app_module.app), "http://loadtest"
+
+    rng = random.Random(args.seed)
+    rec = Recorder()
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        before = await server_metrics(client)
+        gate = asyncio.Semaphore(args.concurrency)
+        t0 = time.perf_counter()
+        await asyncio.gather(*(run_session(client, rec, i, args, random.Random(rng.random()), gate)
+                               for i in range(args.sessions)))
+        elapsed = time.perf_counter() - t0
+        after = await server_metrics(client)
+
+    rss0 = (before.get("process") or {}).get("rss_bytes")
+    rss1 = (after.get("process") or {}).get("rss_bytes")
+    return {
+        "config": {k: v for k, v in vars(args).items()},
+        "elapsed_s": elapsed,
+        "endpoints": rec.summary(elapsed),
+        "memory": {
+            "rss_before": rss0,
+            "rss_after": rss1,
+            "rss_growth": rss1 - rss0 if rss0 is not None and rss1 is not None else None,
+        },
+        "server": {k: after.get(k) for k in ("sessions", "storage", "context", "response_cache", "queue")},
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"Czas: {report['elapsed_s']:.2f} s")
+    print(f"{'endpoint':<18}{'req':>7}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}  kody")
+    for name, r in report["endpoints"].items():
+        codes = " ".join(f"{k}:{v}" for k, v in sorted(r["status"].items(), key=lambda kv: str(kv[0])))
+        print(f"{name:<18}{r['requests']:>7}{r['req_per_s']:>9.1f}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}"
+              f"{r['p99_ms']:>10.1f}{r['max_ms']:>10.1f}  {codes}")
+    mem = report["memory"]
+    if mem["rss_growth"] is not None:
+        print(f"RSS serwera: {mem['rss_before'] / 2**20:.1f} MiB -> {mem['rss_after'] / 2**20:.1f} MiB "
+              f"(+{mem['rss_growth'] / 2**20:.1f} MiB)")
+    sessions = report["server"].get("sessions") or {}
+    queue = report["server"].get("queue") or {}
+    if sessions:
+        print(f"Sesje w pamięci: {sessions.get('resident')} ({sessions.get('resident_bytes')} B), "
+              f"wyrzucone: {sessions.get('evictions')}, odtworzone: {sessions.get('rehydrations')}")
+    if queue:
+        print(f"Kolejka: max głębokość {queue.get('max_queue_depth_seen')}, odrzucone {queue.get('rejected')}, "
+              f"oczekiwanie p95 {queue.get('wait_ms_p95', 0):.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test mini_gemini_chat (/chat, /chat/stream, /clear)")
+    parser.add_argument("--url", help="Adres działającego serwera; bez tego aplikacja w procesie z fake backendem")
+    parser.add_argument("--sessions", type=int, default=200, help="Liczba sesji")
+    parser.add_argument("--turns", type=int, default=5, help="Tury na sesję")
+    parser.add_argument("--concurrency", type=int, default=50, help="Równolegle aktywne sesje")
+    parser.add_argument("--clear-ratio", type=float, default=0.1, help="Prawdopodobieństwo /clear po turze")
+    parser.add_argument("--stream", action="store_true", help="Tury przez /chat/stream (SSE)")
+    parser.add_argument("--latency-ms", type=float, default=300, help="Fake: opóźnienie pierwszego tokenu")
+    parser.add_argument("--tokens-per-s", type=float, default=80, help="Fake: tempo generowania tokenów")
+    parser.add_argument("--reply-tokens", type=int, default=60, help="Fake: długość odpowiedzi w tokenach")
+    parser.add_argument("--timeout", type=float, default=120, help="Timeout pojedynczego żądania [s]")
+    parser.add_argument("--seed", type=int, default=42, help="Ziarno generatora (powtarzalność)")
+    parser.add_argument("--workdir", help="Katalog na sessions/ i cache/ w trybie lokalnym (domyślnie tymczasowy)")
+    parser.add_argument("--json", help="Zapisz wynik do pliku JSON")
+    args = parser.parse_args()
+    args.run_id = f"{int(time.time())}"
+
+    if args.json:
+        args.json = os.path.abspath(args.json)
+    if not args.url:
+        # moduł aplikacji tworzy sessions/ (i cache/) względem bieżącego katalogu przy imporcie
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        os.chdir(args.workdir or tempfile.mkdtemp(prefix="gemini-load-"))
+        os.environ.setdefault("GEMINI_BACKEND", "fake")
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"Zapisano {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,60 @@
 from __future__ import annotations
 
+import asyncio
+import atexit
+import hashlib
 import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
 from pathlib import Path
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Dict,Any,List
+from typing import Dict,Any,List,Optional,Callable
 from google import genai
 from google.genai import types
 from google.genai.types import HttpOptions 
+from dotenv import load_dotenv
 load_dotenv() 
-client = genai.Client()
 
-client = genai.Client()
+# Klient modelu jest tworzony leniwie, przy pierwszym użyciu: import modułu nie wymaga
+# klucza API, a testy i load test mogą podstawić własny klient (set_client)
+# albo lokalny fake backend (GEMINI_BACKEND=fake, zob. fake_gemini.py).
+client = None
 
-DEFAULT_MODEL = "gemini-2.5-flash"
+def make_client():
+    if os.getenv("GEMINI_BACKEND", "").lower() == "fake":
+        from fake_gemini import FakeClient
+        return FakeClient.from_env()
+    return genai.Client()
+
+def get_client():
+    global client
+    if client is None:
+        client = make_client()
+    return client
 
-SESSIONS: Dict[str, any] = {}
+def set_client(new_client) -> None:
+    global client
+    client = new_client
+
+DEFAULT_MODEL = "gemini-2.5-flash"
 
 SESS_DIR = Path("sessions")
 SESS_DIR.mkdir(exist_ok=True)
 
 def _session_path(sid: str) -> Path:
+    """Stary format: cała historia jako jedna lista JSON (np. sessions/adam-1.json)."""
     return SESS_DIR / f"{sid}.json"
 
+def _log_path(sid: str) -> Path:
+    return SESS_DIR / f"{sid}.jsonl"
+
 def _turn_text(turn: types.Content) -> str:
     out = []
     for p in getattr(turn, "parts", []) or []:
@@ -46,18 +77,897 @@ def _json_to_history(items: List[dict] | None) -> List[types.Content]:
         for it in items
     ]
 
-def load_session_history(session_id: str) -> List[dict] | None:
-    p = _session_path(session_id)
-    if p.exists():
+# --- zapis sesji (append-only JSONL) ---
+
+FSYNC_EVERY = int(os.getenv("GEMINI_FSYNC_EVERY", "8"))
+FSYNC_INTERVAL = float(os.getenv("GEMINI_FSYNC_INTERVAL", "1.0"))
+COMPACT_MIN_DEAD = int(os.getenv("GEMINI_COMPACT_MIN_DEAD", "64"))
+MAX_OPEN_LOGS = int(os.getenv("GEMINI_MAX_OPEN_LOGS", "64"))
+
+def _fsync_dir(path: Path) -> None:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+class SessionLog:
+    """Historia sesji jako dziennik JSONL: jedna linia = jedna tura {"role", "text"}.
+
+    Po każdej turze dopisywane są tylko nowe wpisy, a nie cała historia. Gdy historia
+    czatu przestaje być przedłużeniem tego, co jest w pliku, dopisywany jest znacznik
+    {"reset": true} i pełna historia; starsze linie stają się martwe i przy ich nadmiarze
+    plik jest kompaktowany (zapis do pliku tymczasowego + os.replace).
+
+    fsync jest grupowany: co FSYNC_EVERY dopisań albo co FSYNC_INTERVAL sekund,
+    oraz przy zamknięciu pliku. Urwana ostatnia linia (awaria w trakcie zapisu) jest
+    pomijana przy odczycie i obcinana przed kolejnym dopisaniem.
+    Pliki w starym formacie (sessions/*.json) są czytane bez zmian; przy pierwszym zapisie
+    powstaje obok nich plik .jsonl, który od tej pory ma pierwszeństwo.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._open: "OrderedDict[str, Any]" = OrderedDict()  # sid -> plik otwarty do dopisywania
+        self._state: Dict[str, List[int]] = {}  # sid -> [żywe tury, martwe linie, niezsynchronizowane dopisania]
+        self._last_sync: Dict[str, float] = {}
+        self.appended = 0
+        self.fsyncs = 0
+        self.compactions = 0
+
+    # odczyt
+
+    @staticmethod
+    def _read_log(p: Path) -> tuple:
+        """Zwraca (tury, martwe linie) z pliku JSONL, pomijając urwaną ostatnią linię."""
+        items: List[dict] = []
+        dead = 0
         with p.open("r", encoding="utf-8") as f:
-            return json.load(f)
-    return None
+            for line in f:
+                if not line.endswith("\n"):
+                    break
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    break
+                if rec.get("reset"):
+                    dead += len(items) + 1
+                    items = []
+                else:
+                    items.append(rec)
+        return items, dead
+
+    def load(self, session_id: str) -> List[dict] | None:
+        with self._lock:
+            log = _log_path(session_id)
+            if log.exists():
+                items, dead = self._read_log(log)
+                self._state.setdefault(session_id, [len(items), dead, 0])
+                return items
+            legacy = _session_path(session_id)
+            if legacy.exists():
+                with legacy.open("r", encoding="utf-8") as f:
+                    return json.load(f)
+            return None
+
+    # zapis
+
+    def _file(self, session_id: str):
+        f = self._open.get(session_id)
+        if f is not None:
+            self._open.move_to_end(session_id)
+            return f
+        p = _log_path(session_id)
+        f = open(p, "a+b")
+        size = f.seek(0, os.SEEK_END)
+        if size:
+            # obetnij urwaną linię po awarii, żeby nowy wpis nie skleił się ze śmieciami
+            f.seek(size - 1)
+            if f.read(1) != b"\n":
+                f.truncate(self._last_newline(f, size))
+        self._open[session_id] = f
+        while len(self._open) > MAX_OPEN_LOGS:
+            sid, old = self._open.popitem(last=False)
+            # _close_file robi fsync i zeruje licznik dopisań; liczniki tur zostają,
+            # żeby kolejny save nie czytał całego pliku od nowa
+            self._close_file(sid, old)
+            self._last_sync.pop(sid, None)
+        return f
+
+    @staticmethod
+    def _last_newline(f, size: int, chunk: int = 65536) -> int:
+        """Pozycja tuż za ostatnim znakiem nowej linii (0, jeśli go nie ma)."""
+        end = size
+        while end > 0:
+            start = max(0, end - chunk)
+            f.seek(start)
+            cut = f.read(end - start).rfind(b"\n")
+            if cut >= 0:
+                return start + cut + 1
+            end = start
+        return 0
+
+    def _close_file(self, session_id: str, f) -> None:
+        try:
+            if self._state.get(session_id, [0, 0, 0])[2]:
+                f.flush()
+                os.fsync(f.fileno())
+                self.fsyncs += 1
+                self._state[session_id][2] = 0
+        finally:
+            f.close()
+
+    def _write_lines(self, session_id: str, records: List[dict]) -> None:
+        f = self._file(session_id)
+        data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode("utf-8")
+        f.write(data)  # jeden write na turę - w pliku może zostać co najwyżej urwana ostatnia linia
+        f.flush()
+        st = self._state[session_id]
+        st[2] += 1
+        self.appended += 1
+        now = time.monotonic()
+        if st[2] >= FSYNC_EVERY or now - self._last_sync.get(session_id, 0.0) >= FSYNC_INTERVAL:
+            os.fsync(f.fileno())
+            self.fsyncs += 1
+            st[2] = 0
+            self._last_sync[session_id] = now
+
+    def _prefix(self, session_id: str, offset: int) -> List[dict]:
+        return (self.load(session_id) or [])[:offset] if offset else []
+
+    def save(self, session_id: str, items: List[dict], offset: int = 0) -> None:
+        """Utrwala historię sesji, dopisując tylko tury, których jeszcze nie ma w pliku.
+
+        `items` to tury od pozycji `offset`; wcześniejsze są już w pliku (okno kontekstu
+        zwinęło je w streszczenie i nie ma ich w żywym czacie).
+        """
+        with self._lock:
+            st = self._state.get(session_id)
+            if st is None:
+                if _log_path(session_id).exists():
+                    self.load(session_id)
+                    st = self._state[session_id]
+                else:
+                    # nowa sesja albo stary plik .json - zaczynamy od pełnego, skompaktowanego zapisu
+                    self.compact(session_id, self._prefix(session_id, offset) + items)
+                    return
+            live = st[0]
+            known = live - offset
+            if 0 <= known <= len(items):
+                new = items[known:]
+                if new:
+                    self._write_lines(session_id, new)
+                    st[0] = offset + len(items)
+                return
+            # historia została skrócona/podmieniona - znacznik resetu i pełna historia
+            full = self._prefix(session_id, offset) + items
+            self._write_lines(session_id, [{"reset": True}, *full])
+            st[1] += live + 1
+            st[0] = len(full)
+            if st[1] >= COMPACT_MIN_DEAD and st[1] > st[0]:
+                self.compact(session_id, full)
+
+    def compact(self, session_id: str, items: List[dict]) -> None:
+        """Atomowo przepisuje dziennik tak, by zawierał tylko bieżącą historię."""
+        with self._lock:
+            f = self._open.pop(session_id, None)
+            if f is not None:
+                self._close_file(session_id, f)
+            p = _log_path(session_id)
+            tmp = p.with_name(p.name + ".tmp")
+            with tmp.open("w", encoding="utf-8") as out:
+                for it in items:
+                    out.write(json.dumps(it, ensure_ascii=False) + "\n")
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(tmp, p)
+            _fsync_dir(SESS_DIR)
+            self._state[session_id] = [len(items), 0, 0]
+            self.compactions += 1
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            f = self._open.pop(session_id, None)
+            if f is not None:
+                f.close()
+            self._state.pop(session_id, None)
+            self._last_sync.pop(session_id, None)
+            for p in (_log_path(session_id), _session_path(session_id)):
+                try:
+                    p.unlink(missing_ok=True)
+                except OSError:
+                    pass
+
+    def close(self, session_id: Optional[str] = None) -> None:
+        """Zamyka (z fsync) plik jednej sesji albo wszystkie otwarte pliki."""
+        with self._lock:
+            sids = [session_id] if session_id is not None else list(self._open)
+            for sid in sids:
+                f = self._open.pop(sid, None)
+                if f is not None:
+                    self._close_file(sid, f)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "open_files": len(self._open),
+                "appended": self.appended,
+                "fsyncs": self.fsyncs,
+                "compactions": self.compactions,
+            }
+
+SESSION_LOG = SessionLog()
+atexit.register(SESSION_LOG.close)
+
+def load_session_history(session_id: str) -> List[dict] | None:
+    return SESSION_LOG.load(session_id)
+
+def save_session_history(session_id: str, chat, offset: int = 0) -> None:
+    """`offset` to liczba tur zwiniętych przed oknem czatu - pobrana razem z czatem
+    (SESSIONS.get_or_create), bo sesja może w trakcie tury wypaść z pamięci."""
+    SESSION_LOG.save(session_id, _hist_to_json(chat.get_history()), offset)
+
+def delete_session_history(session_id: str) -> None:
+    SESSION_LOG.delete(session_id)
+    CONTEXT.delete(session_id)
+
+# --- okno kontekstu ---
+
+CONTEXT_BUDGET = int(os.getenv("GEMINI_CONTEXT_BUDGET", "16000"))  # tokeny historii wysyłanej do modelu
+CONTEXT_TARGET = float(os.getenv("GEMINI_CONTEXT_TARGET", "0.6"))  # część budżetu zajęta zaraz po przycięciu
+CONTEXT_MIN_TURNS = 4
+CHARS_PER_TOKEN = 4
+SUMMARY_MAX_CHARS = 4000
+
+def estimate_tokens(text: str) -> int:
+    """Zgrubna liczba tokenów (~4 znaki na token + narzut roli/separatorów tury)."""
+    return len(text) // CHARS_PER_TOKEN + 4
+
+def _summary_path(sid: str) -> Path:
+    return SESS_DIR / f"{sid}.summary.json"
+
+def _summary_instruction(summary: Optional[str]) -> Optional[str]:
+    if not summary:
+        return None
+    return "Streszczenie wcześniejszej części rozmowy z użytkownikiem:\n" + summary
+
+class ContextWindow:
+    """Przesuwne okno historii mieszczące się w budżecie tokenów + zwijane streszczenie.
+
+    Gdy historia przekracza budżet, najstarsze tury są zwijane do streszczenia (jedno
+    wywołanie modelu), a w czacie zostaje tyle ostatnich tur, by zająć CONTEXT_TARGET
+    budżetu - dzięki temu streszczanie nie dzieje się przy każdej turze.
+    Streszczenie leży obok pliku sesji (sessions/<id>.summary.json) razem z liczbą
+    zwiniętych tur i skrótem ostatniej z nich, więc przy odtwarzaniu sesji jest tylko
+    wczytywane, a nie liczone od nowa. Pełna historia zostaje w pliku .jsonl.
+    """
+
+    def __init__(self, budget: int = CONTEXT_BUDGET, target: float = CONTEXT_TARGET):
+        self.budget = budget
+        self.target = target
+        self._lock = threading.Lock()
+        self.summaries = 0
+        self.summary_reuses = 0
+        self.summary_errors = 0
+        self.folded_turns = 0
+
+    @staticmethod
+    def _digest(turn: dict) -> str:
+        return hashlib.sha1(f"{turn.get('role')}:{turn.get('text', '')}".encode("utf-8")).hexdigest()
+
+    def load_summary(self, session_id: str) -> Optional[dict]:
+        p = _summary_path(session_id)
+        if not p.exists():
+            return None
+        try:
+            with p.open("r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_summary(self, session_id: str, data: dict) -> None:
+        p = _summary_path(session_id)
+        tmp = p.with_name(p.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, p)
+
+    def delete(self, session_id: str) -> None:
+        _summary_path(session_id).unlink(missing_ok=True)
+
+    def _window_start(self, items: List[dict], limit: int) -> int:
+        """Indeks pierwszej tury okna: ostatnie tury mieszczące się w `limit`, od tury użytkownika."""
+        used = 0
+        start = len(items)
+        while start > 0:
+            cost = estimate_tokens(items[start - 1].get("text", ""))
+            if used + cost > limit and len(items) - start >= CONTEXT_MIN_TURNS:
+                break
+            used += cost
+            start -= 1
+        while start < len(items) and items[start].get("role") != "user":
+            start += 1
+        return start
+
+    def summarize(self, model_name: str, previous: Optional[str], turns: List[dict]) -> str:
+        lines = [f"{t.get('role', 'user')}: {t.get('text', '')}" for t in turns]
+        prompt = (
+            "Streść zwięźle poniższy fragment rozmowy, zachowując fakty, ustalenia i preferencje "
+            "użytkownika potrzebne do jej kontynuowania. Odpowiedz samym streszczeniem.\n\n"
+            + (f"Dotychczasowe streszczenie:\n{previous}\n\n" if previous else "")
+            + "Fragment rozmowy:\n" + "\n".join(lines)
+        )
+        resp = get_client().models.generate_content(model=model_name, contents=prompt)
+        return (resp.text or "").strip()[:SUMMARY_MAX_CHARS]
+
+    def fit(self, session_id: str, model_name: str, items: List[dict], base: int = 0) -> tuple:
+        """Dopasowuje historię do budżetu.
+
+        `items` to tury od pozycji `base` w pełnej historii sesji. Zwraca (start, streszczenie):
+        czat ma zawierać tury od pozycji `start`, a wcześniejsze są w streszczeniu (albo None).
+        """
+        upto, text = base, None
+        summ = self.load_summary(session_id)
+        if summ:
+            k = summ.get("upto", 0) - base
+            if 0 <= k <= len(items) and (k == 0 or self._digest(items[k - 1]) == summ.get("digest")):
+                upto, text = summ["upto"], summ.get("summary")
+                with self._lock:
+                    self.summary_reuses += 1
+        rest = items[upto - base:]
+        summary_cost = estimate_tokens(text) if text else 0
+        if sum(estimate_tokens(t.get("text", "")) for t in rest) + summary_cost <= self.budget:
+            return upto, text
+        cut = self._window_start(rest, int(self.budget * self.target) - summary_cost)
+        if cut == 0:
+            return upto, text
+        try:
+            text = self.summarize(model_name, text, rest[:cut])
+        except Exception:
+            # bez streszczenia nie wolno gubić tur - zostaje dotychczasowe okno
+            with self._lock:
+                self.summary_errors += 1
+            return upto, text
+        upto += cut
+        self._save_summary(session_id, {"upto": upto, "digest": self._digest(rest[cut - 1]), "summary": text})
+        with self._lock:
+            self.summaries += 1
+            self.folded_turns += cut
+        return upto, text
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "budget_tokens": self.budget,
+                "summaries": self.summaries,
+                "summary_reuses": self.summary_reuses,
+                "summary_errors": self.summary_errors,
+                "folded_turns": self.folded_turns,
+            }
+
+CONTEXT = ContextWindow()
+
+# --- magazyn sesji ---
+
+MAX_SESSIONS = int(os.getenv("GEMINI_MAX_SESSIONS", "1000"))
+SESSION_IDLE_TTL = float(os.getenv("GEMINI_SESSION_TTL", "1800"))
+SESSIONS_MAX_BYTES = int(os.getenv("GEMINI_SESSIONS_MAX_BYTES", str(256 * 1024 * 1024)))
+
+class _Session:
+    __slots__ = ("chat", "last_used", "size", "aio", "offset", "summary")
+
+    def __init__(self, chat, size: int, aio: bool, offset: int = 0, summary: Optional[str] = None):
+        self.chat = chat
+        self.last_used = time.monotonic()
+        self.size = size
+        self.aio = aio
+        self.offset = offset  # liczba początkowych tur zwiniętych do streszczenia
+        self.summary = summary
+
+class SessionStore:
+    """Żywe obiekty czatu z limitem liczby, pamięci i czasu bezczynności (LRU + TTL).
+
+    Historia każdej sesji jest zapisywana na dysk po każdej turze, więc wyrzucenie sesji
+    z pamięci jest bezpieczne - przy następnym użyciu zostanie odtworzona z load_session_history.
+    Rozmiar sesji to przybliżona liczba bajtów tekstu jej historii w czacie.
+    Sesja trzyma albo czat synchroniczny (client.chats), albo asynchroniczny (client.aio.chats);
+    przy zmianie rodzaju czat jest przenoszony z historią z pamięci, bez czytania dysku.
+    Czat zawiera tylko okno ostatnich tur (CONTEXT), starsze są w streszczeniu.
+    """
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS, idle_ttl: float = SESSION_IDLE_TTL,
+                 max_bytes: int = SESSIONS_MAX_BYTES):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[str, _Session]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.evictions = 0
+        self.expirations = 0
+        self.rehydrations = 0
+        self.created = 0
+
+    def __contains__(self, session_id: str) -> bool:
+        with self._lock:
+            return session_id in self._items
+
+    @staticmethod
+    def _create(model_name: str, history: List[types.Content], aio: bool, summary: Optional[str] = None):
+        chats = get_client().aio.chats if aio else get_client().chats
+        instruction = _summary_instruction(summary)
+        if instruction:
+            return chats.create(model=model_name, history=history,
+                                config=types.GenerateContentConfig(system_instruction=instruction))
+        return chats.create(model=model_name, history=history)
+
+    def _resident(self, session_id: str, model_name: str, aio: bool) -> Optional[_Session]:
+        item = self._items.get(session_id)
+        if item is None:
+            return None
+        item.last_used = time.monotonic()
+        self._items.move_to_end(session_id)
+        if item.aio != aio:
+            item.chat = self._create(model_name, item.chat.get_history(), aio, item.summary)
+            item.aio = aio
+        return item
+
+    def get_or_create(self, session_id: str, model_name: str, aio: bool = False):
+        """Zwraca (żywy czat sesji, offset jego okna); jeśli nie ma go w pamięci, odtwarza go z dysku.
+
+        Offset trzeba przekazać do zapisu po turze razem z tym czatem.
+        """
+        with self._lock:
+            self._expire()
+            item = self._resident(session_id, model_name, aio)
+            if item is not None:
+                return item.chat, item.offset
+        stored = load_session_history(session_id) or []
+        offset, summary = CONTEXT.fit(session_id, model_name, stored)
+        window = stored[offset:]
+        chat = self._create(model_name, _json_to_history(window), aio, summary)
+        size = sum(len(it.get("text", "")) for it in window)
+        with self._lock:
+            if stored:
+                self.rehydrations += 1
+            else:
+                self.created += 1
+            existing = self._resident(session_id, model_name, aio)
+            if existing is not None:
+                # inny wątek zdążył odtworzyć tę sesję - używamy jego obiektu
+                return existing.chat, existing.offset
+            self._put(session_id, _Session(chat, size, aio, offset, summary))
+        return chat, offset
+
+    def put(self, session_id: str, chat, size: int = 0, aio: bool = False) -> None:
+        with self._lock:
+            self.discard(session_id)
+            self._put(session_id, _Session(chat, size, aio))
+
+    def _put(self, session_id: str, item: _Session) -> None:
+        self._items[session_id] = item
+        self._bytes += item.size
+        self._evict()
+
+    def summary(self, session_id: str) -> Optional[str]:
+        with self._lock:
+            item = self._items.get(session_id)
+            return item.summary if item is not None else None
+
+    def note_turn(self, session_id: str, nbytes: int) -> None:
+        """Dolicza do rozmiaru sesji tekst nowej tury (pytanie + odpowiedź)."""
+        with self._lock:
+            item = self._items.get(session_id)
+            if item is not None:
+                item.size += nbytes
+                self._bytes += nbytes
+                self._evict(keep=session_id)
+
+    def fit_context(self, session_id: str, model_name: str) -> None:
+        """Po turze: jeśli czat przekroczył budżet, zwija najstarsze tury i odtwarza czat z oknem."""
+        with self._lock:
+            item = self._items.get(session_id)
+            # rozmiar w bajtach tekstu to tani, górny szacunek - dokładne liczenie tylko po przekroczeniu
+            if item is None or item.size // CHARS_PER_TOKEN <= CONTEXT.budget:
+                return
+            chat, base = item.chat, item.offset
+        history = chat.get_history()
+        live = _hist_to_json(history)
+        # streszczanie (wywołanie modelu) poza blokadą magazynu
+        offset, summary = CONTEXT.fit(session_id, model_name, live, base)
+        cut = offset - base
+        with self._lock:
+            item = self._items.get(session_id)
+            if cut <= 0 or item is None or item.chat is not chat:
+                return
+            window = live[cut:]
+            size = sum(len(it.get("text", "")) for it in window)
+            item.chat = self._create(model_name, list(history[cut:]), item.aio, summary)
+            item.offset, item.summary = offset, summary
+            self._bytes += size - item.size
+            item.size = size
+
+    def discard(self, session_id: str) -> None:
+        with self._lock:
+            item = self._items.pop(session_id, None)
+            if item is not None:
+                self._bytes -= item.size
+
+    def _expire(self) -> None:
+        # najdawniej używane sesje są na początku, więc wystarczy zdejmować z przodu
+        deadline = time.monotonic() - self.idle_ttl
+        while self._items:
+            sid, item = next(iter(self._items.items()))
+            if item.last_used > deadline:
+                break
+            self.discard(sid)
+            self.expirations += 1
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        while self._items and (len(self._items) > self.max_sessions or self._bytes > self.max_bytes):
+            sid = next(iter(self._items))
+            if sid == keep:
+                if len(self._items) == 1:
+                    break
+                self._items.move_to_end(sid)
+                continue
+            self.discard(sid)
+            self.evictions += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "resident": len(self._items),
+                "resident_bytes": self._bytes,
+                "max_sessions": self.max_sessions,
+                "max_bytes": self.max_bytes,
+                "created": self.created,
+                "rehydrations": self.rehydrations,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
 
-def save_session_history(session_id: str, chat) -> None:
-    p = _session_path(session_id)
-    history = chat.get_history()
-    with p.open("w", encoding="utf-8") as f:
-        json.dump(_hist_to_json(history), f, ensure_ascii=False, indent=2)
+# --- cache odpowiedzi (opcjonalny) ---
+
+RESPONSE_CACHE_DIR = Path(os.getenv("GEMINI_CACHE_DIR", "cache"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("GEMINI_CACHE_MAX_ENTRIES", "1000"))
+RESPONSE_CACHE_MAX_DISK_BYTES = int(os.getenv("GEMINI_CACHE_MAX_DISK_BYTES", str(64 * 1024 * 1024)))
+RESPONSE_CACHE_TTL = float(os.getenv("GEMINI_CACHE_TTL", str(24 * 3600)))
+
+def _normalize_prompt(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+def _context_hash(chat, summary: Optional[str]) -> str:
+    """Skrót kontekstu, w którym pada pytanie: streszczenie + tury z okna czatu."""
+    h = hashlib.sha256((summary or "").encode("utf-8"))
+    for turn in chat.get_history():
+        h.update(b"\x00" + (turn.role or "").encode("utf-8") + b"\x01" + _turn_text(turn).encode("utf-8"))
+    return h.hexdigest()
+
+class ResponseCache:
+    """Dwupoziomowy cache odpowiedzi modelu: LRU w pamięci + pliki JSON na dysku.
+
+    Klucz to (model, znormalizowane pytanie, skrót kontekstu), więc te same pytania
+    zadane na początku nowych sesji trafiają w cache niezależnie od session_id, a pytanie
+    w środku rozmowy tylko wtedy, gdy cała dotychczasowa rozmowa jest taka sama.
+    Oba poziomy mają TTL; dysk jest ograniczony rozmiarem (usuwane najstarsze pliki).
+    """
+
+    def __init__(self, directory: Path = RESPONSE_CACHE_DIR, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+                 max_disk_bytes: int = RESPONSE_CACHE_MAX_DISK_BYTES, ttl: float = RESPONSE_CACHE_TTL):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl
+        self._mem: "OrderedDict[str, tuple]" = OrderedDict()  # klucz -> (odpowiedź, wygasa)
+        self._disk: "OrderedDict[str, int]" = OrderedDict()   # klucz -> rozmiar pliku, od najstarszego
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.mem_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._scan_disk()
+
+    def _scan_disk(self) -> None:
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(".json"):
+                st = entry.stat()
+                files.append((st.st_mtime, entry.name[:-5], st.st_size))
+        for _, key, size in sorted(files):
+            self._disk[key] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    @staticmethod
+    def key(model_name: str, prompt: str, context: str) -> str:
+        raw = json.dumps([model_name, _normalize_prompt(prompt), context], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None:
+                if hit[1] > now:
+                    self._mem.move_to_end(key)
+                    self.mem_hits += 1
+                    return hit[0]
+                del self._mem[key]
+            on_disk = key in self._disk
+        if on_disk:
+            try:
+                with self._path(key).open("r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = None
+            if data and data.get("expires", 0) > now:
+                with self._lock:
+                    self.disk_hits += 1
+                    self._remember(key, data["reply"], data["expires"])
+                return data["reply"]
+            self._drop_disk(key)
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _remember(self, key: str, reply: str, expires: float) -> None:
+        self._mem[key] = (reply, expires)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    def put(self, key: str, reply: str) -> None:
+        if not reply:
+            return
+        expires = time.time() + self.ttl
+        data = json.dumps({"reply": reply, "expires": expires}, ensure_ascii=False).encode("utf-8")
+        p = self._path(key)
+        tmp = p.with_name(p.name + ".tmp")
+        try:
+            tmp.write_bytes(data)
+            os.replace(tmp, p)
+        except OSError:
+            data = b""
+        with self._lock:
+            self.stores += 1
+            self._remember(key, reply, expires)
+            if data:
+                self._disk_bytes += len(data) - self._disk.pop(key, 0)
+                self._disk[key] = len(data)
+                victims = self._evict_disk()
+            else:
+                victims = []
+        for victim in victims:
+            self._path(victim).unlink(missing_ok=True)
+
+    def _evict_disk(self) -> List[str]:
+        victims = []
+        while self._disk and self._disk_bytes > self.max_disk_bytes:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            victims.append(key)
+        return victims
+
+    def _drop_disk(self, key: str) -> None:
+        with self._lock:
+            self._disk_bytes -= self._disk.pop(key, 0)
+        self._path(key).unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            keys = list(self._disk)
+            self._mem.clear()
+            self._disk.clear()
+            self._disk_bytes = 0
+        for key in keys:
+            self._path(key).unlink(missing_ok=True)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.mem_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                "mem_entries": len(self._mem),
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+                "mem_hits": self.mem_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "hit_rate": hits / total if total else 0.0,
+            }
+
+RESPONSE_CACHE: Optional[ResponseCache] = None
+
+def enable_response_cache(**kwargs) -> ResponseCache:
+    global RESPONSE_CACHE
+    RESPONSE_CACHE = ResponseCache(**kwargs)
+    return RESPONSE_CACHE
+
+def disable_response_cache() -> None:
+    global RESPONSE_CACHE
+    RESPONSE_CACHE = None
+
+def _cache_lookup(session_id: str, model_name: str, chat, message: str) -> tuple:
+    """Zwraca (klucz, odpowiedź z cache albo None); klucz None, gdy cache jest wyłączony."""
+    cache = RESPONSE_CACHE
+    if cache is None:
+        return None, None
+    key = cache.key(model_name, message, _context_hash(chat, SESSIONS.summary(session_id)))
+    reply = cache.get(key)
+    if reply is not None:
+        # tura trafia do historii tak, jakby odpowiedział model
+        chat.record_history(
+            user_input=types.Content(role="user", parts=[types.Part(text=message)]),
+            model_output=[types.Content(role="model", parts=[types.Part(text=reply)])],
+            is_valid=True,
+        )
+    return key, reply
+
+if os.getenv("GEMINI_RESPONSE_CACHE"):
+    enable_response_cache()
+
+def _after_turn(session_id: str, model_name: str, chat, offset: int, nbytes: int) -> None:
+    """Zapis nowych tur na dysk, aktualizacja rozmiaru sesji i ewentualne przycięcie okna."""
+    save_session_history(session_id, chat, offset)
+    SESSIONS.note_turn(session_id, nbytes)
+    SESSIONS.fit_context(session_id, model_name)
+
+SESSIONS = SessionStore()
+
+# --- kolejkowanie żądań i limit współbieżności ---
+
+MAX_INFLIGHT = int(os.getenv("GEMINI_MAX_INFLIGHT", "16"))
+MAX_QUEUE = int(os.getenv("GEMINI_MAX_QUEUE", "16"))
+QUEUE_TIMEOUT = float(os.getenv("GEMINI_QUEUE_TIMEOUT", "30"))
+
+class Overloaded(Exception):
+    """Kolejka żądań jest pełna albo minął czas oczekiwania - klient dostaje 429."""
+
+class _SessionQueue:
+    __slots__ = ("head", "tail", "abandoned")
+
+    def __init__(self):
+        self.head = 0        # bilet, którego tura jest teraz obsługiwana
+        self.tail = 0        # następny wolny bilet
+        self.abandoned = set()  # bilety żądań, które zrezygnowały (timeout) w trakcie czekania
+
+class _Pass:
+    __slots__ = ("gate", "session_id", "slot", "released")
+
+    def __init__(self, gate: "RequestGate", session_id: str, slot: bool):
+        self.gate = gate
+        self.session_id = session_id
+        self.slot = slot
+        self.released = False
+
+    def release(self) -> None:
+        self.gate._release(self)
+
+class RequestGate:
+    """Kolejność tur w obrębie sesji + globalny limit równoległych wywołań modelu.
+
+    Każda sesja ma kolejkę FIFO biletów - tury tej samej sesji wykonują się po kolei
+    (wspólny obiekt czatu i zapis historii nie są współbieżne), różne sesje równolegle.
+    Niezależnie od tego najwyżej `max_inflight` żądań naraz trzyma slot na wywołanie modelu.
+    Żądanie, które musiałoby czekać, gdy czeka już `max_queue` innych, jest od razu
+    odrzucane (Overloaded -> 429); czekające dłużej niż `timeout` także.
+    Oczekiwanie blokuje wątek, więc max_inflight + max_queue powinno być mniejsze niż
+    pula wątków serwera (w FastAPI/anyio domyślnie 40).
+    """
+
+    def __init__(self, max_inflight: int = MAX_INFLIGHT, max_queue: int = MAX_QUEUE,
+                 timeout: float = QUEUE_TIMEOUT):
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._sessions: Dict[str, _SessionQueue] = {}
+        self._inflight = 0
+        self._waiting = 0
+        self._waits: deque = deque(maxlen=2048)  # ostatnie czasy oczekiwania [s]
+        self.admitted = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.max_waiting = 0
+
+    def _blocked(self, q: _SessionQueue, ticket: int, slot: bool) -> bool:
+        return q.head != ticket or (slot and self._inflight >= self.max_inflight)
+
+    def enter(self, session_id: str, slot: bool = True) -> _Pass:
+        """Czeka na swoją kolej w sesji (i na slot modelu, gdy slot=True)."""
+        t0 = time.monotonic()
+        with self._cond:
+            q = self._sessions.get(session_id)
+            if q is None:
+                q = self._sessions[session_id] = _SessionQueue()
+            ticket = q.tail
+            if self._blocked(q, ticket, slot):
+                if self._waiting >= self.max_queue:
+                    self.rejected += 1
+                    if q.head == q.tail:
+                        del self._sessions[session_id]
+                    raise Overloaded("Serwer jest przeciążony, spróbuj ponownie za chwilę")
+                q.tail += 1
+                self._waiting += 1
+                self.max_waiting = max(self.max_waiting, self._waiting)
+                try:
+                    deadline = t0 + self.timeout
+                    while self._blocked(q, ticket, slot):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.timeouts += 1
+                            if q.head == ticket:
+                                self._advance(session_id, q)
+                            else:
+                                q.abandoned.add(ticket)
+                            raise Overloaded("Przekroczono czas oczekiwania w kolejce")
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            else:
+                q.tail += 1
+            if slot:
+                self._inflight += 1
+            self.admitted += 1
+            self._waits.append(time.monotonic() - t0)
+        return _Pass(self, session_id, slot)
+
+    def _advance(self, session_id: str, q: _SessionQueue) -> None:
+        q.head += 1
+        while q.head in q.abandoned:
+            q.abandoned.discard(q.head)
+            q.head += 1
+        if q.head == q.tail:
+            del self._sessions[session_id]
+        self._cond.notify_all()
+
+    def _release(self, p: _Pass) -> None:
+        with self._cond:
+            if p.released:
+                return
+            p.released = True
+            if p.slot:
+                self._inflight -= 1
+            self._advance(p.session_id, self._sessions[p.session_id])
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            waits = sorted(self._waits)
+            pct = lambda q: waits[min(len(waits) - 1, int(q * len(waits)))] * 1000 if waits else 0.0
+            return {
+                "inflight": self._inflight,
+                "max_inflight": self.max_inflight,
+                "queue_depth": self._waiting,
+                "max_queue": self.max_queue,
+                "max_queue_depth_seen": self.max_waiting,
+                "active_sessions": len(self._sessions),
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "wait_ms_p50": pct(0.50),
+                "wait_ms_p95": pct(0.95),
+                "wait_ms_max": waits[-1] * 1000 if waits else 0.0,
+            }
+
+GATE = RequestGate()
+
+def _admit(session_id: str, slot: bool = True) -> _Pass:
+    try:
+        return GATE.enter(session_id, slot)
+    except Overloaded as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
 
 app = FastAPI(title="Mini Gemini Chat",version="1.0.0")
 
@@ -65,59 +975,187 @@ class ChatRequest(BaseModel):
     session_id: str
     message: str
     model: str | None = None
+    # pełna historia w odpowiedzi: domyślnie tak dla /chat, nie dla /chat/stream
+    include_turns: bool | None = None
     
 class ClearRequest(BaseModel):
     session_id: str
     
 @app.post("/chat")
 def chat(req: ChatRequest):
+    ticket = _admit(req.session_id)
+    try:
+        return _chat_turn(req)
+    finally:
+        ticket.release()
+
+def _chat_turn(req: ChatRequest):
     model_name = req.model or DEFAULT_MODEL
     
-    if req.session_id not in SESSIONS:
-        stored = load_session_history(req.session_id)
-        history = _json_to_history(stored)
-        chat = client.chats.create(model=model_name,history=history)
-        SESSIONS[req.session_id]=chat
-    else:
-        chat = SESSIONS[req.session_id]
-        
-    resp = chat.send_message(message=req.message)
+    chat, offset = SESSIONS.get_or_create(req.session_id, model_name)
     
-    save_session_history(req.session_id, chat)
+    key, reply = _cache_lookup(req.session_id, model_name, chat, req.message)
+    cached, usage = reply is not None, None
+    if not cached:
+        resp = chat.send_message(message=req.message)
+        reply, usage = resp.text or "", getattr(resp, "usage_metadata", None)
+        if key is not None:
+            RESPONSE_CACHE.put(key, reply)
     
-    turns = [
-        {"role":turn.role, " text": _turn_text(turn)}
-        for turn in chat.get_history()
-    ]
-
+    turns = _turns_payload(chat) if req.include_turns is not False else None
+    _after_turn(req.session_id, model_name, chat, offset, len(req.message) + len(reply))
     
-    return{
+    out = {
         "session_id": req.session_id,
         "model": model_name,
-        "reply": (resp.text or "").strip(),
-        "tokens": getattr(resp, "usage_metadata", None),
-        "turns": turns
+        "reply": reply.strip(),
+        "tokens": usage,
+        "cached": cached,
     }
+    if turns is not None:
+        out["turns"] = turns
+    return out
+
+def _turns_payload(chat) -> List[dict]:
+    return [
+        {"role":turn.role, " text": _turn_text(turn)}
+        for turn in chat.get_history()
+    ]
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+def _usage_dict(usage) -> Any:
+    if usage is None:
+        return None
+    dump = getattr(usage, "model_dump", None)
+    return dump(exclude_none=True) if dump else usage
+
+class _ClosingStreamingResponse(StreamingResponse):
+    """StreamingResponse, który po zakończeniu zawsze wywołuje on_close.
+
+    finally w generatorze nie wystarcza: Starlette wysyła http.response.start przed pierwszym
+    pobraniem z body_iterator, więc gdy klient się rozłączy, żądanie zostanie anulowane albo
+    send rzuci wyjątek w tym oknie, generator w ogóle nie wystartuje. BackgroundTask też
+    odpada - nie wykonuje się po ClientDisconnect.
+    """
+
+    def __init__(self, content, on_close: Callable[[], None], **kwargs):
+        super().__init__(content, **kwargs)
+        self._on_close = on_close
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self._on_close()
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest):
+    """Odpowiedź modelu strumieniowana jako server-sent events.
+
+    Zdarzenia: `delta` ({"text": fragment}) dla każdego fragmentu odpowiedzi, na końcu `done`
+    (reply, tokens i - gdy include_turns - tury z okna kontekstu) albo `error`.
+    Historia sesji jest zapisywana na dysk dopiero po wysłaniu całej odpowiedzi.
+    """
+    model_name = req.model or DEFAULT_MODEL
+    # oczekiwanie w kolejce i odtworzenie sesji (dysk) - poza pętlą zdarzeń
+    ticket = await run_in_threadpool(_admit, req.session_id)
+    try:
+        chat, offset = await run_in_threadpool(SESSIONS.get_or_create, req.session_id, model_name, True)
+        key, cached = await run_in_threadpool(_cache_lookup, req.session_id, model_name, chat, req.message)
+    except BaseException:
+        ticket.release()
+        raise
+    parts: List[str] = []
+    turn_done = False
+
+    def finish():
+        try:
+            _after_turn(req.session_id, model_name, chat, offset, len(req.message) + sum(map(len, parts)))
+        finally:
+            ticket.release()
+
+    def close():
+        # zapis po wysłaniu odpowiedzi; bez await - zerwane połączenie nie może go przerwać
+        if turn_done:
+            asyncio.get_running_loop().run_in_executor(None, finish)
+        else:
+            ticket.release()
+
+    async def turn_events():
+        nonlocal turn_done
+        usage = None
+        if cached is not None:
+            parts.append(cached)
+            yield _sse("delta", {"text": cached})
+        else:
+            try:
+                async for chunk in await chat.send_message_stream(message=req.message):
+                    text = chunk.text or ""
+                    usage = getattr(chunk, "usage_metadata", None) or usage
+                    if text:
+                        parts.append(text)
+                        yield _sse("delta", {"text": text})
+            except Exception as e:
+                yield _sse("error", {"error": str(e)})
+                return
+        reply = "".join(parts)
+        if key is not None and cached is None:
+            RESPONSE_CACHE.put(key, reply)
+        done = {
+            "session_id": req.session_id,
+            "model": model_name,
+            "reply": reply.strip(),
+            "tokens": _usage_dict(usage),
+            "cached": cached is not None,
+        }
+        if req.include_turns:
+            done["turns"] = _turns_payload(chat)
+        turn_done = True
+        yield _sse("done", done)
+
+    return _ClosingStreamingResponse(
+        turn_events(),
+        on_close=close,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.post("/clear")
 def clear(req: ClearRequest):
-    if req.session_id in SESSIONS:
-        del SESSIONS[req.session_id]
+    # czeka, aż skończą się tury tej sesji zgłoszone wcześniej, ale nie zajmuje slotu modelu
+    ticket = _admit(req.session_id, slot=False)
     try:
-        _session_path(req.session_id).unlink(missing_ok=True)
-    except Exception:
-        pass
+        SESSIONS.discard(req.session_id)
+        delete_session_history(req.session_id)
+    finally:
+        ticket.release()
     return {"ok": True}
 
+def _rss_bytes() -> Optional[int]:
+    """Bieżące RSS procesu (Linux: /proc/self/statm), inaczej szczytowe z getrusage."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        return None
+
+@app.get("/metrics")
+def metrics():
+    return {"sessions": SESSIONS.metrics(), "storage": SESSION_LOG.metrics(), "context": CONTEXT.metrics(),
+            "response_cache": RESPONSE_CACHE.metrics() if RESPONSE_CACHE is not None else None,
+            "queue": GATE.metrics(), "process": {"rss_bytes": _rss_bytes()}}
+
 def run_cli(session_id: str, model_name: str):
     
-    if session_id in SESSIONS:
-        chat = SESSIONS[session_id]
-    else:
-        stored = load_session_history(session_id)
-        history = _json_to_history(stored)
-        chat = client.chats.create(model=model_name,history=history)
-        SESSIONS[session_id]=chat
+    chat, offset = SESSIONS.get_or_create(session_id, model_name)
     
     print(f"Gemini CLI — model: {model_name} — session: {session_id}")
     print("Wpisz pytanie i naciśnij Enter.")
@@ -132,20 +1170,23 @@ def run_cli(session_id: str, model_name: str):
                 print("Do zobaczenia!")
                 break
             if user in (":reset", ":clear"):
-                SESSIONS.pop(session_id,None)
-                try:
-                    _session_path(session_id).unlink(missing_ok=True)
-                except Exception:
-                    pass   
-                chat = client.chats.create(model=model_name, history=[])
-                SESSIONS[session_id] = chat
+                SESSIONS.discard(session_id)
+                delete_session_history(session_id)
+                chat = get_client().chats.create(model=model_name, history=[])
+                SESSIONS.put(session_id, chat)
                 print("Sesja wyczyszczona.")
                 continue
             
-            resp = chat.send_message(message=user)
+            # okno kontekstu mogło podmienić obiekt czatu po poprzedniej turze
+            chat, offset = SESSIONS.get_or_create(session_id, model_name)
+            key, reply = _cache_lookup(session_id, model_name, chat, user)
+            if reply is None:
+                reply = chat.send_message(message=user).text or ""
+                if key is not None:
+                    RESPONSE_CACHE.put(key, reply)
             
-            save_session_history(session_id, chat)
-            print("Asystent:", (resp.text or "").strip(), "\n")
+            _after_turn(session_id, model_name, chat, offset, len(user) + len(reply))
+            print("Asystent:", reply.strip(), "\n")
     
     except KeyboardInterrupt:
         print("Sesja Przerwana")
@@ -157,7 +1198,16 @@ if __name__ == "__main__":
     parser.add_argument("--cli", action="store_true", help="Uruchom tryb interaktywny w terminalu")
     parser.add_argument("--session", default="local-cli", help="Id sesji dla CLI (domyślnie: local-cli)")
     parser.add_argument("--model", default=DEFAULT_MODEL, help=f"Nazwa modelu (domyślnie: {DEFAULT_MODEL})")
+    parser.add_argument("--cache", action="store_true", help="Włącz cache odpowiedzi (jak GEMINI_RESPONSE_CACHE=1)")
+    parser.add_argument("--fake", action="store_true", help="Lokalny fake backend zamiast API Gemini (jak GEMINI_BACKEND=fake)")
     args = parser.parse_args()
 
+    if args.fake:
+        from fake_gemini import FakeClient
+        set_client(FakeClient.from_env())
+
+    if args.cache and RESPONSE_CACHE is None:
+        enable_response_cache()
+
     if args.cli:
         run_cli(session_id=args.session, model_name=args.model)
\ No newline at end of file
@@ -0,0 +1,129 @@
+"""
+Benchmark of the extended statistics (median, p90, p99, histogram) against pandas.
+
+Generates a CSV with a single numeric column drawn from a chosen distribution, then
+compares wall time, peak traced memory and accuracy of:
+
+  * pandas: read_csv + to_numeric + Series.quantile + np.histogram (the reference),
+  * calculate_statistics with distribution='exact' (in memory and streaming),
+  * calculate_statistics with distribution='sketch' (streaming KLL) for several k.
+
+Accuracy is reported as the worst rank error of the requested quantiles
+(|F(estimate) - q| on the exact data) and the worst histogram bin error as a
+fraction of all values.
+
+    python bench_statistics.py --rows 1000000 --dist lognormal
+    python bench_statistics.py --rows 5000000 --k 100 200 800 --json results.json
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from statistics_calculator import DEFAULT_QUANTILES, calculate_statistics, _quantile_key
+
+DISTRIBUTIONS = {
+    'normal': lambda rng, n: rng.normal(100.0, 15.0, n),
+    'lognormal': lambda rng, n: rng.lognormal(3.0, 1.0, n),
+    'uniform': lambda rng, n: rng.uniform(-1000.0, 1000.0, n),
+    'bimodal': lambda rng, n: np.where(rng.random(n) < 0.7, rng.normal(10, 2, n), rng.normal(60, 5, n)),
+}
+
+
+def generate_csv(path, rows, dist, seed):
+    """Writes a CSV with an 'id' and a 'value' column; about 1% of the values are not numeric."""
+    rng = np.random.default_rng(seed)
+    values = DISTRIBUTIONS[dist](rng, rows).astype(object)
+    values[rng.random(rows) < 0.01] = 'n/a'
+    pd.DataFrame({'id': np.arange(rows), 'value': values}).to_csv(path, index=False)
+
+
+def measure(fn):
+    """Runs fn and returns (result, seconds, peak traced MiB)."""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak / 2 ** 20
+
+
+def pandas_reference(path, quantiles, bins):
+    series = pd.to_numeric(pd.read_csv(path)['value'], errors='coerce').dropna()
+    stats = {'average': series.mean(), 'variance': series.var(), 'standard_deviation': series.std(),
+             'min': series.min(), 'max': series.max()}
+    for q, v in zip(quantiles, series.quantile(list(quantiles))):
+        stats[_quantile_key(q)] = v
+    counts, edges = np.histogram(series.to_numpy(), bins=bins, range=(stats['min'], stats['max']))
+    stats['histogram'] = {'edges': edges.tolist(), 'counts': counts.tolist()}
+    return stats, np.sort(series.to_numpy())
+
+
+def accuracy(stats, exact_sorted, reference, quantiles):
+    n = len(exact_sorted)
+    rank_err = max(
+        abs(np.searchsorted(exact_sorted, stats[_quantile_key(q)], side='right') / n - q)
+        for q in quantiles
+    )
+    ref_counts = np.array(reference['histogram']['counts'])
+    counts = np.array(stats['histogram']['counts'])
+    hist_err = np.abs(counts - ref_counts).max() / n
+    mean_err = abs(stats['average'] - reference['average']) / max(abs(reference['average']), 1e-300)
+    return rank_err, hist_err, mean_err
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark quantiles/histograms against pandas.")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Number of generated rows.")
+    parser.add_argument("--dist", choices=sorted(DISTRIBUTIONS), default='lognormal', help="Value distribution.")
+    parser.add_argument("--k", type=int, nargs='+', default=[100, 200, 800], help="Sketch sizes to compare.")
+    parser.add_argument("--bins", type=int, default=20, help="Histogram bins.")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed.")
+    parser.add_argument("--json", help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    quantiles = DEFAULT_QUANTILES
+    fd, path = tempfile.mkstemp(suffix='.csv')
+    os.close(fd)
+    try:
+        t0 = time.perf_counter()
+        generate_csv(path, args.rows, args.dist, args.seed)
+        print(f"Generated {args.rows} rows ({args.dist}) in {time.perf_counter() - t0:.1f} s, "
+              f"{os.path.getsize(path) / 2 ** 20:.1f} MiB")
+
+        (reference, exact_sorted), ref_time, ref_mem = measure(lambda: pandas_reference(path, quantiles, args.bins))
+        runs = [('pandas (reference)', ref_time, ref_mem, (0.0, 0.0, 0.0))]
+
+        cases = [('exact, in memory', dict(distribution='exact')),
+                 ('exact, streaming', dict(distribution='exact', streaming=True))]
+        cases += [(f"sketch k={k}, streaming", dict(distribution='sketch', streaming=True, k=k)) for k in args.k]
+        for label, options in cases:
+            stats, elapsed, mem = measure(
+                lambda: calculate_statistics(path, 'value', quantiles=quantiles, bins=args.bins, **options))
+            runs.append((label, elapsed, mem, accuracy(stats, exact_sorted, reference, quantiles)))
+    finally:
+        os.unlink(path)
+
+    print(f"{'method':<26}{'time s':>9}{'peak MiB':>10}{'rank err':>11}{'hist err':>11}{'mean rel err':>14}")
+    for label, elapsed, mem, (rank_err, hist_err, mean_err) in runs:
+        print(f"{label:<26}{elapsed:>9.2f}{mem:>10.1f}{rank_err:>11.5f}{hist_err:>11.5f}{mean_err:>14.2e}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump([
+                {'method': label, 'seconds': elapsed, 'peak_mib': mem,
+                 'rank_error': rank_err, 'histogram_error': hist_err, 'mean_relative_error': mean_err}
+                for label, elapsed, mem, (rank_err, hist_err, mean_err) in runs
+            ], f, indent=2)
+        print(f"Saved {args.json}")
+
+
+if __name__ == "__main__":
+    main()
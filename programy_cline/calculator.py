@@ -1,4 +1,18 @@
+import argparse
 import math
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+DIVISION_BY_ZERO, EVEN_ROOT_OF_NEGATIVE, NOT_FINITE, INVALID_INPUT = 1, 2, 3, 4
+ERROR_MESSAGES = {
+    DIVISION_BY_ZERO: "Error! Division by zero.",
+    EVEN_ROOT_OF_NEGATIVE: "Error! Root of a negative number with an even index.",
+    NOT_FINITE: "Error! Result is not a finite real number.",
+    INVALID_INPUT: "Error! Invalid input.",
+}
 
 def add(x, y):
     return x + y
@@ -11,7 +25,7 @@ def multiply(x, y):
 
 def divide(x, y):
     if y == 0:
-        return "Error! Division by zero."
+        return ERROR_MESSAGES[DIVISION_BY_ZERO]
     return x / y
 
 def power(x, y):
@@ -19,9 +33,166 @@ def power(x, y):
 
 def root(x, y):
     if x < 0 and y % 2 == 0:
-        return "Error! Root of a negative number with an even index."
+        return ERROR_MESSAGES[EVEN_ROOT_OF_NEGATIVE]
     return x ** (1/y)
 
+def _no_errors(x):
+    return np.zeros(len(x), dtype=np.int8)
+
+def divide_batch(x, y):
+    """Vectorized divide(): returns (result, error codes); rows with y == 0 get DIVISION_BY_ZERO."""
+    return x / y, np.where(y == 0, DIVISION_BY_ZERO, 0).astype(np.int8)
+
+def root_batch(x, y):
+    """
+    Vectorized root(): returns (result, error codes).
+
+    Even roots of negative numbers get EVEN_ROOT_OF_NEGATIVE and a zero index DIVISION_BY_ZERO.
+    Odd roots of negative numbers are real (-8 root 3 = -2), where the scalar root() gives a complex number.
+    """
+    negative = x < 0
+    parity = np.mod(y, 2)
+    inverse = 1 / y
+    result = np.where(negative & (parity == 1), -np.power(-x, inverse), np.power(x, inverse))
+    errors = np.where(negative & (parity == 0), EVEN_ROOT_OF_NEGATIVE, 0)
+    errors = np.where(y == 0, DIVISION_BY_ZERO, errors)
+    return result, errors.astype(np.int8)
+
+BATCH_OPERATIONS = {
+    'add': lambda x, y: (x + y, _no_errors(x)),
+    'subtract': lambda x, y: (x - y, _no_errors(x)),
+    'multiply': lambda x, y: (x * y, _no_errors(x)),
+    'divide': divide_batch,
+    'power': lambda x, y: (np.power(x, y), _no_errors(x)),
+    'root': root_batch,
+}
+OPERATORS = {'+': 'add', '-': 'subtract', '*': 'multiply', '/': 'divide', '^': 'power', '**': 'power',
+             **{name: name for name in BATCH_OPERATIONS}}
+
+def _evaluate_grouped(x, y, ops):
+    codes, tokens = pd.factorize(pd.Series(ops))
+    # group the rows by operator with one stable sort (radix sort for small integer codes),
+    # so every operator runs on a contiguous slice instead of a boolean mask over all rows
+    order = np.argsort(codes.astype(np.int16 if len(tokens) < 2 ** 15 else np.int64), kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(-1, len(tokens) + 1))
+    xs, ys = x[order], y[order]
+    result = np.full(len(x), np.nan)
+    errors = np.zeros(len(x), dtype=np.int8)
+    # code -1: missing operator
+    errors[bounds[0]:bounds[1]] = INVALID_INPUT
+    # masked rows are flagged by their error codes, so NumPy's divide/overflow/invalid warnings are noise
+    with np.errstate(all='ignore'):
+        for i, token in enumerate(tokens):
+            lo, hi = bounds[i + 1], bounds[i + 2]
+            name = OPERATORS.get(str(token).lower())
+            if name is None:
+                errors[lo:hi] = INVALID_INPUT
+            else:
+                result[lo:hi], errors[lo:hi] = BATCH_OPERATIONS[name](xs[lo:hi], ys[lo:hi])
+    unsorted_result = np.empty_like(result)
+    unsorted_errors = np.empty_like(errors)
+    unsorted_result[order] = result
+    unsorted_errors[order] = errors
+    return unsorted_result, unsorted_errors
+
+def evaluate_batch(x, y, op):
+    """
+    Evaluates many operations at once with NumPy.
+
+    Args:
+        x (array-like): First operands (NaN marks an operand that could not be parsed).
+        y (array-like): Second operands.
+        op (str or array-like): One operation for all rows ('divide', '/', ...) or an operator
+            per row (+ - * / ^ ** root, or the operation names).
+
+    Returns:
+        tuple: (result, errors). ``result`` is a float64 array with NaN in every masked row and
+        ``errors`` an int8 array of codes (0 = ok, see ``ERROR_MESSAGES``), so a row is masked
+        for the same reasons the interactive functions return an error string.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if isinstance(op, str):
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown operation '{op}'.")
+        with np.errstate(all='ignore'):
+            result, errors = BATCH_OPERATIONS[OPERATORS[op]](x, y)
+    else:
+        result, errors = _evaluate_grouped(x, y, op)
+    errors[np.isnan(x) | np.isnan(y)] = INVALID_INPUT
+    # e.g. 0 ^ -1, a fractional power of a negative number or an overflow
+    errors[(errors == 0) & ~np.isfinite(result)] = NOT_FINITE
+    result[errors != 0] = np.nan
+    return result, errors
+
+def read_batch(source, op=None, columns=None, sep=None):
+    """
+    Reads a batch from a file or stdin ('-').
+
+    Without ``op`` every row is an expression 'x op y' (three fields); with ``op`` every row
+    holds the two operands, taken from the first two fields or from the named ``columns`` of a
+    file with a header row. Fields are separated by ``sep`` (default: ',' for .csv files,
+    otherwise any whitespace); lines starting with '#' are skipped.
+
+    Returns:
+        pandas.DataFrame: Columns x, op and y as read (op filled with ``op`` in operand-column mode).
+    """
+    if sep is None:
+        sep = ',' if str(source).endswith('.csv') else r'\s+'
+    src = sys.stdin if source == '-' else source
+    # low_memory=False: a stray non-numeric field must not give chunks of one column different dtypes
+    options = dict(sep=sep, comment='#', skipinitialspace=True, low_memory=False)
+    if op is None:
+        return pd.read_csv(src, header=None, names=['x', 'op', 'y'], dtype={'op': 'category'}, **options)
+    if columns:
+        df = pd.read_csv(src, usecols=columns, **options)[columns]
+        df.columns = ['x', 'y']
+    else:
+        df = pd.read_csv(src, header=None, usecols=[0, 1], names=['x', 'y'], **options)
+    df.insert(1, 'op', op)
+    return df
+
+def _operand(column):
+    return pd.to_numeric(column, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+
+def write_batch(dest, batch, result, errors):
+    """
+    Writes the input rows plus result and error (empty when ok) as CSV to a file or stdout ('-').
+
+    A destination ending in .npz gets just the ``result`` and ``error`` (code) arrays in NumPy's
+    binary format, which skips formatting millions of floats as text.
+    """
+    if str(dest).endswith('.npz'):
+        np.savez(dest, result=result, error=errors)
+        return
+    messages = np.array([''] + [ERROR_MESSAGES[c] for c in sorted(ERROR_MESSAGES)], dtype=object)
+    # operands keep the dtype they were read with: integer columns are written much faster than floats
+    out = batch.assign(result=result, error=messages[errors])
+    out.to_csv(sys.stdout if dest == '-' else dest, index=False)
+
+def run_batch(source, op=None, columns=None, sep=None, output='-'):
+    """Reads, evaluates and (unless ``output`` is None) writes a batch, then reports throughput on stderr."""
+    t0 = time.perf_counter()
+    batch = read_batch(source, op, columns, sep)
+    x, y = _operand(batch['x']), _operand(batch['y'])
+    t1 = time.perf_counter()
+    result, errors = evaluate_batch(x, y, op or batch['op'].array)
+    t2 = time.perf_counter()
+    if output is not None:
+        write_batch(output, batch, result, errors)
+    t3 = time.perf_counter()
+
+    rows = len(result)
+    total = t3 - t0
+    print(f"Evaluated {rows} rows in {total:.2f} s ({rows / total if total else 0:,.0f} rows/s; "
+          f"read {t1 - t0:.2f} s, evaluate {t2 - t1:.3f} s "
+          f"= {rows / (t2 - t1) if t2 > t1 else 0:,.0f} rows/s, write {t3 - t2:.2f} s)", file=sys.stderr)
+    counts = np.bincount(errors, minlength=len(ERROR_MESSAGES) + 1)
+    for code in sorted(ERROR_MESSAGES):
+        if counts[code]:
+            print(f"  {ERROR_MESSAGES[code]} {counts[code]} rows", file=sys.stderr)
+    return result, errors
+
 def main():
     while True:
         print("Select operation:")
@@ -67,4 +238,29 @@ def main():
             print("Invalid input")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Calculator: interactive menu, or vectorized batch evaluation with --batch.")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="Evaluate every row of FILE ('-' for stdin) instead of the interactive menu; "
+                             "rows are 'x op y' with op one of + - * / ^ ** root.")
+    parser.add_argument("--op", choices=list(BATCH_OPERATIONS),
+                        help="Apply this operation to two operand columns instead of reading an operator per row.")
+    parser.add_argument("--columns",
+                        help="With --op: comma-separated names of the two operand columns in a file with a header row.")
+    parser.add_argument("--sep", help="Field separator (default: ',' for .csv files, otherwise whitespace).")
+    parser.add_argument("--output", default='-',
+                        help="CSV file for x, op, y, result and error (default: stdout); "
+                             "a .npz file gets only the result and error code arrays, much faster for large batches.")
+    parser.add_argument("--no-output", action="store_true", help="Only report error counts and throughput.")
+    args = parser.parse_args()
+
+    if args.batch is None:
+        main()
+    else:
+        columns = [c.strip() for c in args.columns.split(',')] if args.columns else None
+        try:
+            if columns is not None and (args.op is None or len(columns) != 2):
+                raise ValueError("--columns needs --op and exactly two column names.")
+            run_batch(args.batch, args.op, columns, args.sep, None if args.no_output else args.output)
+        except (ValueError, OSError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
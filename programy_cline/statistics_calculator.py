@@ -1,36 +1,657 @@
 import pandas as pd
+import numpy as np
 import argparse
+import glob
+import hashlib
+import json
+import math
+import os
+import shutil
+import tempfile
 import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
 
-def calculate_statistics(file_path, column_name):
+DEFAULT_CHUNKSIZE = 100_000
+DEFAULT_SKETCH_K = 200
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+DEFAULT_BINS = 10
+DEFAULT_CACHE_DIR = os.environ.get('STATS_CACHE_DIR') or os.path.join(
+    os.path.expanduser('~'), '.cache', 'statistics_calculator')
+DEFAULT_CACHE_MAX_MB = 1024
+
+
+class RunningMoments:
+    """
+    Numerically stable running count, mean, sum of squared deviations (M2), min and max.
+
+    Chunks are reduced with NumPy and folded in with Chan's parallel update, so the
+    result does not depend on how the data was split and memory stays constant.
+    Partial results from different chunks, files or processes merge exactly.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values):
+        """
+        Adds a chunk of values.
+
+        Args:
+            values (numpy.ndarray): Finite or infinite floats; NaNs must already be dropped.
+        """
+        n_b = len(values)
+        if n_b == 0:
+            return
+        mean_b = float(values.mean())
+        m2_b = float(((values - mean_b) ** 2).sum())
+        self.merge_parts(n_b, mean_b, m2_b, float(values.min()), float(values.max()))
+
+    def merge_parts(self, n_b, mean_b, m2_b, min_b=math.inf, max_b=-math.inf):
+        """Chan et al. combination of the current moments with another partial (n, mean, M2, min, max)."""
+        if n_b == 0:
+            return
+        self.min = min(self.min, min_b)
+        self.max = max(self.max, max_b)
+        n_a = self.count
+        if n_a == 0:
+            self.count, self.mean, self.m2 = n_b, mean_b, m2_b
+            return
+        n = n_a + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self.m2 += m2_b + delta * delta * n_a * n_b / n
+        self.count = n
+
+    def merge(self, other):
+        """Merges another RunningMoments (or its ``partial()`` tuple) into this one."""
+        if isinstance(other, RunningMoments):
+            other = other.partial()
+        self.merge_parts(*other)
+
+    def partial(self):
+        """Picklable partial aggregate: (count, mean, M2, min, max)."""
+        return (self.count, self.mean, self.m2, self.min, self.max)
+
+    @classmethod
+    def from_partial(cls, partial):
+        moments = cls()
+        moments.merge_parts(*partial)
+        return moments
+
+    def result(self):
+        """
+        Returns the statistics in the same shape as the in-memory path.
+
+        Variance is the sample variance (ddof=1), like pandas ``Series.var``; it is NaN
+        for a single value.
+        """
+        variance = self.m2 / (self.count - 1) if self.count > 1 else math.nan
+        return {
+            'average': self.mean,
+            'variance': variance,
+            'standard_deviation': math.sqrt(variance) if not math.isnan(variance) else math.nan
+        }
+
+    def summary(self):
+        """``result()`` extended with count, min and max."""
+        return {'count': self.count, **self.result(), 'min': self.min, 'max': self.max}
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch over NumPy arrays: bounded memory, mergeable, vectorized updates.
+
+    Level ``h`` holds items of weight ``2**h``. When a level grows past its capacity it is
+    sorted and every other item (random offset) is promoted to the next level, halving
+    its size while keeping the total weight equal to the number of values seen.
+    The sketch keeps roughly ``3 * k`` items regardless of input size; larger ``k`` gives
+    smaller rank error (on the order of ``1 / k``) at the cost of memory.
+    """
+
+    def __init__(self, k=DEFAULT_SKETCH_K, seed=None):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - 1 - level
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, values):
+        """Adds a chunk of values (numpy.ndarray without NaNs)."""
+        if len(values) == 0:
+            return
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], np.asarray(values, dtype=float)])
+        self._compress()
+
+    def merge(self, other):
+        """Merges another sketch into this one; the result is a valid sketch of both inputs."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.n += other.n
+        self._compress()
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            items = self.levels[h]
+            if len(items) <= self._capacity(h):
+                h += 1
+                continue
+            if h + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(items)
+            keep = items[:0]
+            if len(items) % 2:
+                # an odd item out stays at this level so no weight is lost
+                i = int(self._rng.integers(len(items)))
+                keep, items = items[i:i + 1], np.delete(items, i)
+            self.levels[h] = keep
+            self.levels[h + 1] = np.concatenate([self.levels[h + 1], items[int(self._rng.integers(2))::2]])
+            # adding a level shrinks the capacities below it, so start over from the bottom
+            h = 0
+
+    def size(self):
+        """Number of items currently stored."""
+        return sum(len(items) for items in self.levels)
+
+    def _weighted(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(lvl), 2 ** h, dtype=np.int64) for h, lvl in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], np.cumsum(weights[order])
+
+    def quantiles(self, qs):
+        """Approximate quantiles (nearest rank) for a sequence of ``q`` in [0, 1]."""
+        items, cum = self._weighted()
+        idx = np.searchsorted(cum, np.asarray(qs, dtype=float) * self.n, side='left')
+        return items[np.minimum(idx, len(items) - 1)]
+
+    def rank_below(self, edges):
+        """Approximate number of values strictly below each edge."""
+        items, cum = self._weighted()
+        idx = np.searchsorted(items, np.asarray(edges, dtype=float), side='left')
+        return np.where(idx > 0, cum[np.maximum(idx - 1, 0)], 0)
+
+
+def _quantile_key(q):
+    return 'median' if q == 0.5 else f"p{q * 100:g}"
+
+
+def _histogram_edges(lo, hi, bins):
+    if not (math.isfinite(lo) and math.isfinite(hi)):
+        return None
+    # same edges as np.histogram(values, bins, range=(lo, hi)) would use
+    return np.histogram_bin_edges(np.array([lo, hi]), bins=bins, range=(lo, hi))
+
+
+class ColumnAccumulator:
+    """
+    Per-column aggregate: running moments plus, optionally, the data needed for quantiles.
+
+    Args:
+        distribution (str): None for moments only, 'sketch' for a bounded-memory KLL sketch,
+            or 'exact' to keep the numeric values (NumPy, for data that fits in memory).
+        k (int): Sketch accuracy/memory parameter.
+    """
+
+    def __init__(self, distribution=None, k=DEFAULT_SKETCH_K):
+        if distribution not in (None, 'sketch', 'exact'):
+            raise ValueError(f"Unknown distribution mode '{distribution}'. Use 'sketch' or 'exact'.")
+        self.distribution = distribution
+        self.moments = RunningMoments()
+        self.sketch = KLLSketch(k) if distribution == 'sketch' else None
+        self.values = [] if distribution == 'exact' else None
+
+    @property
+    def count(self):
+        return self.moments.count
+
+    def update(self, values):
+        self.moments.update(values)
+        if self.sketch is not None:
+            self.sketch.update(values)
+        elif self.values is not None and len(values):
+            self.values.append(values)
+
+    def merge(self, other):
+        self.moments.merge(other.moments)
+        if self.sketch is not None and other.sketch is not None:
+            self.sketch.merge(other.sketch)
+        elif self.values is not None and other.values is not None:
+            self.values.extend(other.values)
+
+    def distribution_stats(self, quantiles=DEFAULT_QUANTILES, bins=DEFAULT_BINS):
+        """
+        Returns min, max, the requested quantiles and a histogram over [min, max].
+
+        Exact mode uses ``np.quantile`` (linear interpolation, like pandas) and
+        ``np.histogram``; sketch mode returns nearest-rank estimates and approximate bin counts.
+        """
+        lo, hi = self.moments.min, self.moments.max
+        out = {'min': lo, 'max': hi}
+        if self.distribution is None or self.count == 0:
+            return out
+        edges = _histogram_edges(lo, hi, bins)
+        if self.values is not None:
+            arr = np.concatenate(self.values)
+            qv = np.quantile(arr, quantiles)
+            counts = np.histogram(arr, bins=edges)[0] if edges is not None else None
+        else:
+            qv = self.sketch.quantiles(quantiles)
+            if edges is not None:
+                # np.histogram bins are [a, b) except the last one, which includes max
+                below = np.concatenate([[0], self.sketch.rank_below(edges[1:-1]), [self.count]])
+                counts = np.diff(below)
+            else:
+                counts = None
+        for q, v in zip(quantiles, qv):
+            out[_quantile_key(q)] = float(v)
+        out['histogram'] = None if counts is None else {
+            'edges': [float(e) for e in edges],
+            'counts': [int(c) for c in counts],
+        }
+        return out
+
+    def summary(self, quantiles=DEFAULT_QUANTILES, bins=DEFAULT_BINS):
+        return {'count': self.count, **self.moments.result(), **self.distribution_stats(quantiles, bins)}
+
+
+def _numeric(values):
+    """Same coercion as the in-memory path: non-numeric values become NaN and are dropped."""
+    arr = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    return arr[~np.isnan(arr)]
+
+
+def _stream_csv(file_path, columns, chunksize, factory=RunningMoments):
+    header = set(pd.read_csv(file_path, nrows=0).columns)
+    present = [c for c in columns if c in header]
+    moments = {c: factory() for c in present}
+    if present:
+        # Only the requested columns are parsed and at most `chunksize` rows are held at a time.
+        for chunk in pd.read_csv(file_path, usecols=present, chunksize=chunksize):
+            for c in present:
+                moments[c].update(_numeric(chunk[c]))
+    return moments
+
+
+def _stream_xml(file_path, columns, chunksize, factory=RunningMoments):
+    wanted = set(columns)
+    moments = {}
+    buffers = {}
+    parents = []
+    for event, elem in ET.iterparse(file_path, events=('start', 'end')):
+        if event == 'start':
+            parents.append(elem)
+            continue
+        parents.pop()
+        if elem.tag != 'record':
+            continue
+        values = {}
+        for child in elem:
+            if child.tag in wanted:
+                # like the dict comprehension in the in-memory path, the last matching child wins
+                values[child.tag] = child.text
+        for c, value in values.items():
+            if c not in moments:
+                moments[c] = factory()
+                buffers[c] = []
+            buf = buffers[c]
+            buf.append(value)
+            if len(buf) >= chunksize:
+                moments[c].update(_numeric(buf))
+                buf.clear()
+        # drop the processed record so the tree never grows beyond the current path
+        elem.clear()
+        if parents:
+            parents[-1].remove(elem)
+    for c, buf in buffers.items():
+        if buf:
+            moments[c].update(_numeric(buf))
+    return moments
+
+
+def _check_format(file_path):
+    if not (file_path.endswith('.csv') or file_path.endswith('.xml')):
+        raise ValueError(f"Unsupported file format: '{file_path}'. Please provide a .csv or .xml file.")
+
+
+class _ColumnWriter:
+    """Stream sink that appends the coerced float64 values of one column to a raw binary file."""
+
+    def __init__(self, directory):
+        fd, self.path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        self._file = os.fdopen(fd, 'wb')
+        self.count = 0
+
+    def update(self, values):
+        np.asarray(values, dtype=np.float64).tofile(self._file)
+        self.count += len(values)
+
+    def close(self):
+        self._file.close()
+
+
+class ColumnCache:
+    """
+    On-disk binary cache of parsed numeric columns, memory-mapped on later runs.
+
+    Every source file gets a directory named after the hash of its absolute path, holding
+    one raw float64 file per column (the values after numeric coercion, NaNs dropped, in
+    file order) and a ``meta.json`` with the source size and mtime it was built from.
+    A changed size or mtime invalidates the entry. Columns missing from the file are
+    recorded as well, so the file is not parsed again just to look for them.
+    Cached columns are opened with ``np.memmap``: nothing is parsed or copied up front
+    and the OS page cache is shared between runs.
+
+    Args:
+        directory (str): Cache directory (default: ``$STATS_CACHE_DIR`` or
+            ``~/.cache/statistics_calculator``).
+        max_bytes (int): Size bound enforced by ``evict()``.
+        rebuild (bool): Ignore existing entries and parse the files again.
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_CACHE_MAX_MB * 2 ** 20, rebuild=False):
+        self.directory = directory or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        self.rebuild = rebuild
+
+    def entry_path(self, file_path):
+        key = hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()[:20]
+        return os.path.join(self.directory, key)
+
+    def _read_meta(self, entry, st):
+        try:
+            with open(os.path.join(entry, 'meta.json'), encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('size') != st.st_size or meta.get('mtime_ns') != st.st_mtime_ns:
+            return None
+        return meta
+
+    def _write_meta(self, entry, meta):
+        fd, tmp = tempfile.mkstemp(dir=entry, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        # meta.json appears only after all column files are in place
+        os.replace(tmp, os.path.join(entry, 'meta.json'))
+
+    def columns(self, file_path, columns, chunksize=DEFAULT_CHUNKSIZE):
+        """
+        Returns read-only float64 arrays for the requested columns, parsing the file only for
+        columns that are not cached yet (all of them in a single pass).
+
+        Args:
+            file_path (str): The path to the input file (CSV or XML).
+            columns (list): Column names.
+            chunksize (int): Number of rows (CSV) or values (XML) parsed at a time.
+
+        Returns:
+            dict: Column name -> ``np.memmap`` (or an empty array) for every requested column
+            present in the file.
+        """
+        st = os.stat(file_path)
+        entry = self.entry_path(file_path)
+        meta = None if self.rebuild else self._read_meta(entry, st)
+        if meta is None:
+            shutil.rmtree(entry, ignore_errors=True)
+            meta = {'path': os.path.abspath(file_path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+                    'columns': {}, 'missing': []}
+        todo = [c for c in dict.fromkeys(columns) if c not in meta['columns'] and c not in meta['missing']]
+        if todo:
+            self._build(file_path, entry, meta, todo, chunksize)
+        else:
+            try:
+                # the mtime of meta.json is the last-use time for eviction
+                os.utime(os.path.join(entry, 'meta.json'))
+            except OSError:
+                pass
+        return {c: self._map(os.path.join(entry, meta['columns'][c]['file']), meta['columns'][c]['count'])
+                for c in columns if c in meta['columns']}
+
+    def _build(self, file_path, entry, meta, columns, chunksize):
+        os.makedirs(entry, exist_ok=True)
+        writers = []
+
+        def factory():
+            writers.append(_ColumnWriter(entry))
+            return writers[-1]
+
+        stream = _stream_csv if file_path.endswith('.csv') else _stream_xml
+        try:
+            found = stream(file_path, columns, chunksize, factory)
+            for w in writers:
+                w.close()
+            for c, w in found.items():
+                name = hashlib.sha1(c.encode('utf-8')).hexdigest()[:16] + '.f64'
+                os.replace(w.path, os.path.join(entry, name))
+                meta['columns'][c] = {'file': name, 'count': w.count}
+            meta['missing'] += [c for c in columns if c not in found]
+            self._write_meta(entry, meta)
+        except BaseException:
+            for w in writers:
+                w.close()
+                if os.path.exists(w.path):
+                    os.unlink(w.path)
+            raise
+
+    @staticmethod
+    def _map(path, count):
+        if count == 0:
+            # np.memmap cannot map an empty file
+            return np.empty(0)
+        return np.memmap(path, dtype=np.float64, mode='r', shape=(count,))
+
+    def evict(self, keep=()):
+        """
+        Removes least recently used entries until the cache fits in ``max_bytes``.
+
+        Args:
+            keep (iterable): Source file paths whose entries must stay (e.g. the ones just used);
+                they may keep the cache above the bound.
+
+        Returns:
+            int: Number of bytes freed.
+        """
+        if not os.path.isdir(self.directory):
+            return 0
+        keep = {self.entry_path(p) for p in keep}
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            entry = os.path.join(self.directory, name)
+            if not os.path.isdir(entry):
+                continue
+            size = sum(e.stat().st_size for e in os.scandir(entry) if e.is_file())
+            meta = os.path.join(entry, 'meta.json')
+            used = os.path.getmtime(meta) if os.path.exists(meta) else os.path.getmtime(entry)
+            entries.append((used, size, entry))
+            total += size
+        freed = 0
+        for used, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if entry in keep:
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            freed += size
+        return freed
+
+
+def _cached_partials(cache, file_path, columns, chunksize, distribution, k):
+    out = {}
+    for c, values in cache.columns(file_path, columns, chunksize).items():
+        acc = ColumnAccumulator(distribution, k)
+        # slices of the memory map are views; only one chunk's temporaries are allocated at a time
+        for start in range(0, len(values), chunksize):
+            acc.update(values[start:start + chunksize])
+        out[c] = acc
+    return out
+
+
+def file_partials(file_path, columns, chunksize=DEFAULT_CHUNKSIZE, distribution=None, k=DEFAULT_SKETCH_K,
+                  cache=None):
+    """
+    Streams one file and returns mergeable partial aggregates.
+
+    Args:
+        file_path (str): The path to the input file (CSV or XML).
+        columns (list): Column names to aggregate.
+        chunksize (int): Number of rows (CSV) or values (XML) reduced at a time.
+        distribution (str): None, 'sketch' or 'exact' (see ``ColumnAccumulator``).
+        k (int): Sketch accuracy/memory parameter.
+        cache (ColumnCache): Read the columns from this binary cache (filling it on a miss)
+            instead of parsing the file.
+
+    Returns:
+        dict: Column name -> ``ColumnAccumulator`` for every requested column present in the file.
+    """
+    _check_format(file_path)
+    if cache is not None:
+        return _cached_partials(cache, file_path, columns, chunksize, distribution, k)
+    stream = _stream_csv if file_path.endswith('.csv') else _stream_xml
+    return stream(file_path, columns, chunksize, lambda: ColumnAccumulator(distribution, k))
+
+
+def expand_paths(patterns):
+    """Expands glob patterns (plain paths are kept as given), preserving order and dropping duplicates."""
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        if not matches:
+            raise FileNotFoundError(f"No files match '{pattern}'.")
+        paths.extend(matches)
+    return list(dict.fromkeys(paths))
+
+
+def calculate_statistics_many(patterns, columns, workers=None, chunksize=DEFAULT_CHUNKSIZE,
+                              distribution=None, quantiles=DEFAULT_QUANTILES, bins=DEFAULT_BINS,
+                              k=DEFAULT_SKETCH_K, cache=None):
+    """
+    Calculates statistics for many columns over many files (or glob patterns) in one run.
+
+    Each file is parsed once for all columns. Files are spread over a process pool and
+    every worker returns partial aggregates (count, mean, M2, min, max) that are merged
+    exactly, in file order, so the result does not depend on the number of workers.
+    Quantile sketches are merged the same way (approximately, within the sketch error).
+
+    Args:
+        patterns (list): File paths and/or glob patterns (CSV or XML).
+        columns (list): Column names to aggregate.
+        workers (int): Number of worker processes (default: CPU count; 1 runs in-process).
+        chunksize (int): Number of rows (CSV) or values (XML) reduced at a time.
+        distribution (str): None, 'sketch' or 'exact' to add quantiles and a histogram.
+        quantiles (tuple): Quantiles to report when ``distribution`` is set.
+        bins (int): Number of histogram bins.
+        k (int): Sketch accuracy/memory parameter.
+        cache (ColumnCache): Binary column cache to read from and fill; entries beyond its
+            size bound are evicted after the run.
+
+    Returns:
+        dict: Column name -> statistics (count, average, variance, standard_deviation, min, max
+        and, with ``distribution``, quantiles and histogram), or ``{'error': message}`` for a
+        column that is missing or has no numeric data.
+    """
+    paths = expand_paths(patterns)
+    for path in paths:
+        _check_format(path)
+    workers = workers or os.cpu_count() or 1
+    n = len(paths)
+    if workers == 1 or n == 1:
+        partials = [file_partials(p, columns, chunksize, distribution, k, cache) for p in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, n)) as pool:
+            partials = list(pool.map(file_partials, paths, [columns] * n, [chunksize] * n,
+                                     [distribution] * n, [k] * n, [cache] * n))
+    if cache is not None:
+        cache.evict(keep=paths)
+
+    merged = {c: ColumnAccumulator(distribution, k) for c in columns}
+    seen = set()
+    for part in partials:
+        for c, p in part.items():
+            seen.add(c)
+            merged[c].merge(p)
+
+    results = {}
+    for c in columns:
+        if c not in seen:
+            results[c] = {'error': f"Column '{c}' not found in any of the files."}
+        elif merged[c].count == 0:
+            results[c] = {'error': f"No valid numeric data found in column '{c}'."}
+        else:
+            results[c] = merged[c].summary(quantiles, bins)
+    return results
+
+
+def calculate_statistics(file_path, column_name, streaming=False, chunksize=DEFAULT_CHUNKSIZE,
+                         distribution=None, quantiles=DEFAULT_QUANTILES, bins=DEFAULT_BINS, k=DEFAULT_SKETCH_K,
+                         cache=None):
     """
     Calculates statistics (average, variance, standard deviation) for a given column in a CSV or XML file.
 
     Args:
         file_path (str): The path to the input file (CSV or XML).
         column_name (str): The name of the column to calculate statistics for.
+        streaming (bool): Read the file in a single pass with constant memory instead of
+            loading it into a DataFrame. Results match the in-memory path up to float rounding.
+        chunksize (int): Number of rows (CSV) or values (XML) reduced at a time in streaming mode.
+        distribution (str): Also report min, max, quantiles and a histogram: 'sketch' uses a
+            bounded-memory KLL sketch, 'exact' uses NumPy on all values (must fit in memory).
+        quantiles (tuple): Quantiles to report (0.5 is reported as 'median', 0.9 as 'p90', ...).
+        bins (int): Number of equal-width histogram bins between min and max.
+        k (int): Sketch accuracy/memory parameter; rank error shrinks roughly as 1/k.
+        cache (ColumnCache): Read the column from this binary cache, parsing the file only on
+            the first run (or after it changes). Implies the single-pass aggregation.
 
     Returns:
         dict: A dictionary containing the calculated statistics.
     """
+    if not (file_path.endswith('.csv') or file_path.endswith('.xml')):
+        raise ValueError("Unsupported file format. Please provide a .csv or .xml file.")
+
+    if cache is not None:
+        acc = _cached_partials(cache, file_path, [column_name], chunksize, distribution, k).get(column_name)
+        cache.evict(keep=[file_path])
+    elif streaming:
+        stream = _stream_csv if file_path.endswith('.csv') else _stream_xml
+        acc = stream(file_path, [column_name], chunksize, lambda: ColumnAccumulator(distribution, k)).get(column_name)
+    if cache is not None or streaming:
+        if acc is None:
+            raise ValueError(f"Column '{column_name}' not found in the file.")
+        if acc.count == 0:
+            raise ValueError(f"No valid numeric data found in column '{column_name}'.")
+        stats = acc.moments.result()
+        if distribution:
+            stats.update(acc.distribution_stats(quantiles, bins))
+        return stats
+
     if file_path.endswith('.csv'):
         df = pd.read_csv(file_path)
-    elif file_path.endswith('.xml'):
+    else:
         tree = ET.parse(file_path)
         root = tree.getroot()
         data = []
         for elem in root.findall('.//record'):  # Assuming a simple 'record' structure
             data.append({child.tag: child.text for child in elem})
         df = pd.DataFrame(data)
-    else:
-        raise ValueError("Unsupported file format. Please provide a .csv or .xml file.")
 
     if column_name not in df.columns:
         raise ValueError(f"Column '{column_name}' not found in the file.")
 
     # Convert column to numeric, coercing errors to NaN
     df[column_name] = pd.to_numeric(df[column_name], errors='coerce')
-    
+
     # Drop rows with NaN in the specified column
     df.dropna(subset=[column_name], inplace=True)
 
@@ -42,23 +663,118 @@ def calculate_statistics(file_path, column_name):
     variance = df[column_name].var()
     std_deviation = df[column_name].std()
 
-    return {
+    stats = {
         'average': average,
         'variance': variance,
         'standard_deviation': std_deviation
     }
+    if distribution:
+        acc = ColumnAccumulator(distribution, k)
+        acc.update(df[column_name].to_numpy(dtype=float))
+        stats.update(acc.distribution_stats(quantiles, bins))
+    return stats
+
+def format_table(results):
+    """Renders multi-column results as a fixed-width text table."""
+    keys = ['count', 'average', 'variance', 'standard_deviation', 'min', 'max']
+    headers = ['Column', 'Count', 'Average', 'Variance', 'Std Dev', 'Min', 'Max']
+    for stats in results.values():
+        if 'error' not in stats:
+            # quantile columns (median, p90, ...) in the order they were requested
+            extra = [k for k in stats if k not in keys and k not in ('histogram', 'error')]
+            keys += extra
+            headers += [k.title() if k == 'median' else k.upper() for k in extra]
+            break
+    width = max([len(headers[0])] + [len(c) for c in results])
+    lines = [f"{headers[0]:<{width}}" + "".join(f"{h:>16}" for h in headers[1:])]
+    for column, stats in results.items():
+        if 'error' in stats:
+            lines.append(f"{column:<{width}}  Error: {stats['error']}")
+            continue
+        cells = [f"{stats['count']:>16}"] + [f"{stats[k]:>16.2f}" for k in keys[1:]]
+        lines.append(f"{column:<{width}}" + "".join(cells))
+    return "\n".join(lines)
+
+
+def format_histogram(histogram, indent="  "):
+    """Renders a histogram as one line per bin with a proportional bar."""
+    if not histogram:
+        return f"{indent}Histogram: not available (non-finite min/max)"
+    edges, counts = histogram['edges'], histogram['counts']
+    peak = max(counts) or 1
+    lines = [f"{indent}Histogram:"]
+    for i, count in enumerate(counts):
+        close = "]" if i == len(counts) - 1 else ")"
+        lines.append(f"{indent}  [{edges[i]:>12.2f}, {edges[i + 1]:>12.2f}{close} {count:>10}  {'#' * round(30 * count / peak)}")
+    return "\n".join(lines)
+
+
+def _json_safe(value):
+    """NaN/inf (e.g. the variance of a single value) are not valid JSON."""
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, dict):
+        return {k: _json_safe(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_json_safe(v) for v in value]
+    return value
+
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Calculate statistics for a column in a CSV or XML file.")
-    parser.add_argument("file_path", help="Path to the CSV or XML file.")
-    parser.add_argument("column_name", help="Name of the column to analyze.")
-    
+    parser = argparse.ArgumentParser(description="Calculate statistics for one or more columns in CSV or XML files.")
+    parser.add_argument("file_path", nargs='+',
+                        help="Path(s) to CSV or XML files; glob patterns such as 'exports/*.csv' are expanded.")
+    parser.add_argument("column_name",
+                        help="Name of the column to analyze; several columns can be given comma-separated.")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Single pass with constant memory (for files that do not fit in RAM).")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE,
+                        help=f"Rows per chunk in streaming mode (default: {DEFAULT_CHUNKSIZE}).")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes for multiple files (default: CPU count).")
+    parser.add_argument("--format", choices=('text', 'table', 'json'), default='text',
+                        help="Output format; 'text' is the single-column report and switches to 'table' for several columns or files.")
+    parser.add_argument("--distribution", choices=('sketch', 'exact'), default=None,
+                        help="Also report min/max, quantiles and a histogram: 'sketch' in bounded memory, 'exact' with NumPy.")
+    parser.add_argument("--quantiles", default=",".join(str(q) for q in DEFAULT_QUANTILES),
+                        help="Comma-separated quantiles to report (default: 0.5,0.9,0.99).")
+    parser.add_argument("--bins", type=int, default=DEFAULT_BINS,
+                        help=f"Histogram bins (default: {DEFAULT_BINS}).")
+    parser.add_argument("--k", type=int, default=DEFAULT_SKETCH_K,
+                        help=f"Sketch size/accuracy parameter; larger is more accurate (default: {DEFAULT_SKETCH_K}).")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Parse the files directly instead of using the binary column cache.")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Re-parse the files and overwrite their cache entries.")
+    parser.add_argument("--cache-dir", default=None,
+                        help=f"Column cache directory (default: $STATS_CACHE_DIR or {DEFAULT_CACHE_DIR}).")
+    parser.add_argument("--cache-max-mb", type=float, default=DEFAULT_CACHE_MAX_MB,
+                        help=f"Evict least recently used cache entries above this size (default: {DEFAULT_CACHE_MAX_MB}).")
+
     args = parser.parse_args()
+    columns = [c.strip() for c in args.column_name.split(',') if c.strip()]
+    options = dict(chunksize=args.chunksize, distribution=args.distribution, bins=args.bins, k=args.k)
+    if not args.no_cache:
+        options['cache'] = ColumnCache(args.cache_dir, int(args.cache_max_mb * 2 ** 20), rebuild=args.rebuild)
 
     try:
-        stats = calculate_statistics(args.file_path, args.column_name)
-        print(f"Statistics for column '{args.column_name}':")
-        for key, value in stats.items():
-            print(f"  {key.replace('_', ' ').title()}: {value:.2f}")
-    except (ValueError, FileNotFoundError) as e:
+        options['quantiles'] = tuple(float(q) for q in args.quantiles.split(',') if q.strip())
+        if any(not 0 <= q <= 1 for q in options['quantiles']):
+            raise ValueError("Quantiles must be between 0 and 1.")
+        single = len(args.file_path) == 1 and not glob.has_magic(args.file_path[0]) and len(columns) == 1
+        if single and args.format == 'text':
+            stats = calculate_statistics(args.file_path[0], columns[0], streaming=args.streaming, **options)
+            histogram = stats.pop('histogram', None)
+            print(f"Statistics for column '{columns[0]}':")
+            for key, value in stats.items():
+                print(f"  {key.replace('_', ' ').title()}: {value:.2f}")
+            if args.distribution:
+                print(format_histogram(histogram))
+        else:
+            results = calculate_statistics_many(args.file_path, columns, workers=args.workers, **options)
+            if args.format == 'json':
+                print(json.dumps(_json_safe(results), indent=2))
+            else:
+                print(format_table(results))
+    except (ValueError, OSError) as e:
         print(f"Error: {e}")
@@ -0,0 +1,340 @@
+"""
+    Asynchroniczne API task managera (psycopg AsyncConnection + AsyncConnectionPool)
+
+    Operacje na bazie z task_manager.py (CRUD, list/tree, search, changes, plan, batch),
+    ale bez blokowania pętli asyncio: wiele równoległych żądań współdzieli kilka połączeń z puli.
+    import/export (pliki + COPY) i metryki są tylko w API synchronicznym;
+    CLI dalej korzysta z synchronicznego chat_call w task_manager.py.
+"""
+
+from __future__ import annotations
+import asyncio
+from datetime import datetime
+from typing import Optional, List, Tuple, Dict, Any
+
+import psycopg
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+import task_manager as _tm
+from task_manager import (
+    Task, TaskNode, TaskPriority, CACHE_NOTIFY_CHANNEL,
+    POOL_MIN_SIZE, POOL_MAX_SIZE, POOL_MAX_IDLE, POOL_TIMEOUT, BATCH_ERRORS,
+    CHANGES_LIMIT, DEFAULT_DAILY_CAPACITY,
+    _resolve_url, _SCHEMA_SQL, _TRGM_SQL, _SCHEMA_READY, _SCHEMA_LOCK_SQL, SCHEMA_LOCK_KEY,
+    _INSERT_SQL, _insert_params, _update_query, _DELETE_SQL, _GET_SQL,
+    _query_sql, _paginate, _tree_sql, _build_tree, tree_to_dicts,
+    _search_sql, _search_params, _search_page, _CHANGES_SQL, _changes_page,
+    _plan_query, compute_plan,
+    _add_args, _update_fields, _list_args, _plain_list, _plan_args, _batch_op, _batch_response,
+    _NOTIFY_SQL, _SUBTREE_SQL, _delete_keys, cache_stats,
+    _cache_defer, _cache_flush, _cache_usable,
+    task_row, task_to_dict,
+)
+
+
+async def connect(db_url: Optional[str] = None) -> psycopg.AsyncConnection:
+    return await psycopg.AsyncConnection.connect(_resolve_url(db_url), autocommit=False, row_factory=dict_row)
+
+async def init_db(conn: psycopg.AsyncConnection) -> None:
+    async with conn.cursor() as cur:
+        await cur.execute(_SCHEMA_LOCK_SQL, (SCHEMA_LOCK_KEY,))
+        for sql in _SCHEMA_SQL:
+            await cur.execute(sql)
+        try:
+            async with conn.transaction():
+                for sql in _TRGM_SQL:
+                    await cur.execute(sql)
+        except psycopg.Error:
+            # brak uprawnień do rozszerzenia - filtr po tytule działa wtedy bez indeksu
+            pass
+    await conn.commit()
+
+_SCHEMA_LOCK = asyncio.Lock()
+
+async def ensure_schema(conn: psycopg.AsyncConnection, db_url: Optional[str] = None) -> None:
+    """Wywołuje init_db tylko raz na proces dla danej bazy (wspólny stan z API synchronicznym).
+
+    Pierwsze równoległe żądania czekają na jedno wywołanie init_db zamiast uruchamiać DDL naraz.
+    """
+    url = _resolve_url(db_url)
+    if url in _SCHEMA_READY:
+        return
+    async with _SCHEMA_LOCK:
+        if url not in _SCHEMA_READY:
+            await init_db(conn)
+            _SCHEMA_READY.add(url)
+
+
+# pula połączeń
+
+_POOLS: Dict[str, AsyncConnectionPool] = {}
+_POOLS_LOCK = asyncio.Lock()
+
+async def get_pool(db_url: Optional[str] = None,
+                   min_size: Optional[int] = None,
+                   max_size: Optional[int] = None,
+                   max_idle: Optional[float] = None) -> AsyncConnectionPool:
+    """Zwraca długo żyjącą asynchroniczną pulę połączeń (otwieraną przy pierwszym użyciu)."""
+    url = _resolve_url(db_url)
+    pool = _POOLS.get(url)
+    if pool is not None:
+        return pool
+    async with _POOLS_LOCK:
+        pool = _POOLS.get(url)
+        if pool is None:
+            pool = AsyncConnectionPool(
+                url,
+                min_size=min_size if min_size is not None else POOL_MIN_SIZE,
+                max_size=max_size if max_size is not None else POOL_MAX_SIZE,
+                max_idle=max_idle if max_idle is not None else POOL_MAX_IDLE,
+                timeout=POOL_TIMEOUT,
+                kwargs={"autocommit": False, "row_factory": dict_row},
+                name="tasks-async",
+                open=False,
+            )
+            await pool.open()
+            _POOLS[url] = pool
+    return pool
+
+def pool_stats(db_url: Optional[str] = None) -> Dict[str, Any]:
+    """Statystyki puli asynchronicznej w tym samym formacie co task_manager.pool_stats."""
+    pool = _POOLS.get(_resolve_url(db_url))
+    st = pool.get_stats() if pool is not None else {}
+    return {
+        "checkouts": st.get("requests_num", 0),
+        "waits": st.get("requests_queued", 0),
+        "wait_ms": st.get("requests_wait_ms", 0),
+        "errors": st.get("requests_errors", 0),
+        "size": st.get("pool_size", 0),
+        "available": st.get("pool_available", 0),
+        "max_size": st.get("pool_max", 0),
+    }
+
+async def close_pools() -> None:
+    async with _POOLS_LOCK:
+        for pool in _POOLS.values():
+            await pool.close()
+        _POOLS.clear()
+
+
+async def _cache_invalidate(conn, tasks=(), lists=()) -> None:
+    """NOTIFY w bieżącej transakcji; lokalny cache jest czyszczony dopiero po commicie (_cache_flush)."""
+    payload = _cache_defer(conn, tasks, lists)
+    if payload:
+        async with conn.cursor() as cur:
+            await cur.execute(_NOTIFY_SQL, (CACHE_NOTIFY_CHANNEL, payload))
+
+
+# CRUD (korzystają z tego samego cache co API synchroniczne, jeśli jest włączony)
+
+async def add_task(conn, title, description="", due_at=None, estimate_min=0, priority=TaskPriority.NORMAL, parent_id=None, commit=True) -> int:
+    async with conn.cursor() as cur:
+        await cur.execute(_INSERT_SQL, _insert_params(title, description, due_at, estimate_min, priority, parent_id))
+        new_id = (await cur.fetchone())["id"]
+    await _cache_invalidate(conn, lists=[parent_id])
+    if commit:
+        await conn.commit()
+        _cache_flush(conn)
+    return new_id
+
+async def update_task(conn, task_id: int, commit=True, **fields):
+    if not fields:
+        return
+    q, vals = _update_query(task_id, fields)
+    async with conn.cursor() as cur:
+        await cur.execute(q, vals)
+        row = await cur.fetchone()
+    if _tm.TASK_CACHE is not None and row is not None:
+        await _cache_invalidate(conn, *_tm.TASK_CACHE.update_keys(task_id, fields, row["old_parent_id"]))
+    if commit:
+        await conn.commit()
+        _cache_flush(conn)
+
+async def delete_task(conn, task_id: int, commit=True):
+    cache = _tm.TASK_CACHE
+    async with conn.cursor() as cur:
+        if cache is not None:
+            await cur.execute(_SUBTREE_SQL, (task_id,))
+            rows = await cur.fetchall()
+        await cur.execute(_DELETE_SQL, (task_id,))
+    if cache is not None:
+        await _cache_invalidate(conn, *_delete_keys(rows))
+    if commit:
+        await conn.commit()
+        _cache_flush(conn)
+
+async def get_task(conn, task_id: int) -> Task:
+    cache = _tm.TASK_CACHE
+    if cache is not None and not _cache_usable(conn):
+        cache = None
+    if cache is not None:
+        task = cache.get(("task", task_id))
+        if task is not None:
+            return task
+    async with conn.cursor(row_factory=task_row) as cur:
+        await cur.execute(_GET_SQL, (task_id,))
+        task = await cur.fetchone()
+        if not task:
+            raise ValueError(f"Brak zadania {task_id}")
+    if cache is not None:
+        cache.put(("task", task_id), task, [task])
+    return task
+
+async def query_tasks(conn, limit: Optional[int] = None, **filters) -> Tuple[List[Task], Optional[str]]:
+    """Asynchroniczny odpowiednik task_manager.query_tasks (te same filtry i kursor)."""
+    query, params = _query_sql(limit=limit, **filters)
+    async with conn.cursor(row_factory=task_row) as cur:
+        await cur.execute(query, params)
+        rows = await cur.fetchall()
+    return _paginate(rows, limit)
+
+async def list_tasks(conn, parent_id: Optional[int] = None) -> List[Task]:
+    cache = _tm.TASK_CACHE
+    if cache is not None and not _cache_usable(conn):
+        cache = None
+    if cache is not None:
+        tasks = cache.get(("list", parent_id))
+        if tasks is not None:
+            return list(tasks)
+    tasks = (await query_tasks(conn, parent_id=parent_id))[0]
+    if cache is not None:
+        cache.put(("list", parent_id), tasks, tasks)
+    return list(tasks)
+
+async def list_tree(conn, root_id: Optional[int] = None, max_depth: Optional[int] = None) -> List[TaskNode]:
+    async with conn.cursor() as cur:
+        await cur.execute(_tree_sql(root_id), {"root_id": root_id, "max_depth": max_depth})
+        rows = await cur.fetchall()
+    return _build_tree(rows, root_id)
+
+async def search_tasks(conn, query: str, root_id: Optional[int] = None, limit: int = 20,
+                       cursor: Optional[str] = None) -> Tuple[List[Tuple[Task, float]], Optional[str]]:
+    """Asynchroniczny odpowiednik task_manager.search_tasks (ten sam kursor)."""
+    async with conn.cursor() as cur:
+        await cur.execute(_search_sql(root_id, bool(cursor)), _search_params(query, root_id, limit, cursor))
+        rows = await cur.fetchall()
+    return _search_page(rows, limit)
+
+async def list_changes(conn, since: int = 0, limit: int = CHANGES_LIMIT) -> Dict[str, Any]:
+    """Asynchroniczny odpowiednik task_manager.list_changes."""
+    async with conn.cursor() as cur:
+        await cur.execute(_CHANGES_SQL, {"since": since, "limit": limit})
+        rows = await cur.fetchall()
+    await conn.commit()
+    return _changes_page(rows, since, limit)
+
+async def plan_schedule(conn, daily_capacity: int = DEFAULT_DAILY_CAPACITY,
+                        start: Optional[datetime] = None, root_id: Optional[int] = None) -> Dict[str, Any]:
+    """Asynchroniczny odpowiednik task_manager.plan_schedule.
+
+    compute_plan (czysty CPU, setki ms dla dziesiątek tysięcy zadań) idzie w wątku, żeby nie blokować pętli.
+    """
+    async with conn.cursor(row_factory=task_row) as cur:
+        await cur.execute(*_plan_query(root_id))
+        tasks = await cur.fetchall()
+    if root_id is not None and not tasks:
+        raise ValueError(f"Brak zadania {root_id}")
+    return await asyncio.to_thread(compute_plan, tasks, daily_capacity, start)
+
+
+# function call
+
+async def chat_call(payload: Dict[str, Any], db_url: Optional[str] = None) -> Dict[str, Any]:
+    """Asynchroniczna obsługa payloadu JSON; połączenia zawsze pochodzą z puli."""
+
+    async def handle_add(conn, p, commit=True):
+        new_id = await add_task(conn, commit=commit, **_add_args(p))
+        return {"status": "ok", "id": new_id}
+
+    async def handle_update(conn, p, commit=True):
+        await update_task(conn, p["id"], commit=commit, **_update_fields(p))
+        return {"status": "ok"}
+
+    async def handle_delete(conn, p, commit=True):
+        await delete_task(conn, p["id"], commit=commit)
+        return {"status": "ok"}
+
+    async def handle_show(conn, p):
+        task = await get_task(conn, p["id"])
+        return {"status": "ok", "task": task_to_dict(task)}
+
+    async def handle_list(conn, p):
+        args = _list_args(p)
+        if _plain_list(args):
+            tasks, next_cursor = await list_tasks(conn, args["parent_id"]), None
+        else:
+            tasks, next_cursor = await query_tasks(conn, **args)
+        return {"status": "ok", "tasks": [task_to_dict(t) for t in tasks], "next_cursor": next_cursor}
+
+    async def handle_tree(conn, p):
+        nodes = await list_tree(conn, p.get("root_id"), p.get("max_depth"))
+        return {"status": "ok", "tree": tree_to_dicts(nodes)}
+
+    async def handle_search(conn, p):
+        results, next_cursor = await search_tasks(conn, p["q"], p.get("root_id"), p.get("limit", 20), p.get("cursor"))
+        return {"status": "ok",
+                "results": [{**task_to_dict(t), "rank": rank} for t, rank in results],
+                "next_cursor": next_cursor}
+
+    async def handle_changes(conn, p):
+        return {"status": "ok", **await list_changes(conn, p.get("since", 0), p.get("limit", CHANGES_LIMIT))}
+
+    async def handle_plan(conn, p):
+        return {"status": "ok", **await plan_schedule(conn, **_plan_args(p))}
+
+    async def handle_batch(conn, p):
+        """Jak handle_batch w task_manager.chat_call (atomic / savepoint na operację)."""
+        ops = p.get("ops") or []
+        atomic = p.get("atomic", True)
+        results: List[Dict[str, Any]] = []
+        failed = None
+
+        async def run_op(op):
+            cmd, kwargs = _batch_op(op)
+            return await commands[cmd](conn, op, **kwargs)
+
+        try:
+            async with conn.transaction():
+                for i, op in enumerate(ops):
+                    try:
+                        if atomic:
+                            results.append(await run_op(op))
+                        else:
+                            async with conn.transaction():
+                                results.append(await run_op(op))
+                    except BATCH_ERRORS as e:
+                        results.append({"status": "error", "error": str(e)})
+                        if atomic:
+                            failed = i
+                            raise psycopg.Rollback()
+        finally:
+            _cache_flush(conn)
+        return _batch_response(ops, results, atomic, failed)
+
+    commands = {
+        "add": handle_add,
+        "update": handle_update,
+        "delete": handle_delete,
+        "show": handle_show,
+        "list": handle_list,
+        "tree": handle_tree,
+        "search": handle_search,
+        "batch": handle_batch,
+        "plan": handle_plan,
+        "changes": handle_changes,
+    }
+
+    cmd = payload.get("command")
+    if cmd == "stats":
+        return {"status": "ok", "pool": pool_stats(db_url), "cache": cache_stats()}
+    if cmd not in commands:
+        return {"status": "error", "error": "Nieznana komenda"}
+
+    try:
+        pool = await get_pool(db_url)
+        async with pool.connection() as conn:
+            await ensure_schema(conn, db_url)
+            return await commands[cmd](conn, payload)
+    except (ValueError, KeyError, psycopg.Error) as e:
+        return {"status": "error", "error": str(e)}
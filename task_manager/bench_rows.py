@@ -0,0 +1,106 @@
+"""
+    Benchmark dekodowania wierszy: dict_row + Task.from_row + asdict
+    kontra task_row + task_to_dict oraz task_json_row (od razu JSON).
+
+    Domyślnie na syntetycznych krotkach (bez bazy), z --db na prawdziwym
+    zapytaniu generate_series w bazie z DATABASE_URL.
+
+    python bench_rows.py --rows 100000
+    python bench_rows.py --rows 100000 --db
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import time
+from dataclasses import asdict
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from task_manager import TASK_FIELDS, Task, task_row, task_json_row, task_to_dict, connect
+
+DB_QUERY = """
+    SELECT g AS id,
+           CASE WHEN g > 1 THEN g / 10 + 1 END AS parent_id,
+           'zadanie ' || g AS title,
+           'opis zadania ' || g AS description,
+           CASE WHEN g % 4 = 0 THEN NULL ELSE now()::timestamp(0) + g * interval '1 hour' END AS due_at,
+           (g % 120)::int AS estimate_min,
+           (1 + g % 3)::int AS priority,
+           (ARRAY['todo','in_progress','done'])[1 + g % 3] AS status,
+           now()::timestamp(0) AS created_at,
+           now()::timestamp(0) AS updated_at
+    FROM generate_series(1, %s) g
+    """
+
+
+def synthetic_rows(n: int):
+    base = datetime(2024, 1, 1, 9, 0)
+    statuses = ("todo", "in_progress", "done")
+    return [
+        (i, i // 10 + 1 if i > 1 else None, f"zadanie {i}", f"opis zadania {i}",
+         None if i % 4 == 0 else base + timedelta(hours=i), i % 120, 1 + i % 3,
+         statuses[i % 3], base, base)
+        for i in range(1, n + 1)
+    ]
+
+
+def timed(label: str, fn, results: dict) -> None:
+    t0 = time.perf_counter()
+    fn()
+    dt = time.perf_counter() - t0
+    results[label] = dt
+    print(f"  {label:<40} {dt * 1000:9.1f} ms")
+
+
+def bench_synthetic(n: int) -> dict:
+    rows = synthetic_rows(n)
+    cursor = SimpleNamespace(description=[SimpleNamespace(name=f) for f in TASK_FIELDS])
+    results: dict = {}
+
+    def old_path():
+        # dict_row tworzy dict(zip(nazwy, wartości)) dla każdego wiersza
+        dicts = [dict(zip(TASK_FIELDS, r)) for r in rows]
+        return json.dumps([asdict(Task.from_row(d)) for d in dicts], default=str)
+
+    def task_row_path():
+        make = task_row(cursor)
+        return json.dumps([task_to_dict(make(r)) for r in rows], default=str)
+
+    def json_row_path():
+        make = task_json_row(cursor)
+        return json.dumps([make(r) for r in rows])
+
+    print(f"Syntetyczne wiersze: {n}")
+    timed("dict_row + from_row + asdict + dumps", old_path, results)
+    timed("task_row + task_to_dict + dumps", task_row_path, results)
+    timed("task_json_row + dumps", json_row_path, results)
+    return results
+
+
+def bench_db(n: int) -> dict:
+    results: dict = {}
+    with connect() as conn:
+        def fetch(factory, convert):
+            with conn.cursor(row_factory=factory) if factory else conn.cursor() as cur:
+                cur.execute(DB_QUERY, (n,))
+                return json.dumps([convert(r) for r in cur.fetchall()], default=str)
+
+        print(f"Wiersze z bazy: {n}")
+        timed("dict_row + from_row + asdict + dumps",
+              lambda: fetch(None, lambda r: asdict(Task.from_row(r))), results)
+        timed("task_row + task_to_dict + dumps", lambda: fetch(task_row, task_to_dict), results)
+        timed("task_json_row + dumps", lambda: fetch(task_json_row, lambda r: r), results)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dekodowania wierszy zadań")
+    parser.add_argument("--rows", type=int, default=100_000, help="Liczba wierszy (domyślnie 100000)")
+    parser.add_argument("--db", action="store_true", help="Pobieraj wiersze z bazy (DATABASE_URL)")
+    args = parser.parse_args()
+
+    res = bench_db(args.rows) if args.db else bench_synthetic(args.rows)
+    baseline = res["dict_row + from_row + asdict + dumps"]
+    for label, dt in res.items():
+        print(f"  {label:<40} x{baseline / dt:5.2f}")
@@ -0,0 +1,163 @@
+"""
+    Powtarzalny benchmark task managera na lokalnym PostgreSQL (DATABASE_URL).
+
+    Zasiewa bazę drzewem zadań o zadanym kształcie (wide / deep / mixed) przez
+    import COPY, a potem mierzy przepustowość i opóźnienia komend add/list/show/update
+    wykonywanych przez chat_call na puli połączeń. Wynik zawiera też rozbicie
+    na fazy (connect, init_db, query, decode, serialize) z enable_metrics().
+
+    UWAGA: --reset czyści tabele tasks i task_changes - używaj tylko na bazie testowej.
+
+    python bench_suite.py --shape mixed --tasks 10000 --ops 2000 --reset
+    python bench_suite.py --shape deep --depth 200 --tasks 20000 --threads 8 --json wynik.json
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Iterator
+
+import task_manager as tm
+
+OPS = ("add", "list", "show", "update")
+
+
+def generate_tree(shape: str, n: int, fanout: int, depth: int, rng: random.Random) -> Iterator[Dict[str, Any]]:
+    """Rekordy importu (id, parent_id, ...) dla zadanego kształtu drzewa."""
+    def record(i: int, parent):
+        return {
+            "id": i,
+            "parent_id": parent,
+            "title": f"zadanie {i}",
+            "description": f"opis zadania {i}",
+            "estimate_min": rng.randint(0, 240),
+            "priority": rng.randint(1, 3),
+            "status": rng.choice(("todo", "todo", "in_progress", "done")),
+            "due_at": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}" if rng.random() < 0.6 else None,
+        }
+
+    if shape == "wide":
+        # korzenie z `fanout` bezpośrednimi podzadaniami
+        i = 0
+        while i < n:
+            root = i = i + 1
+            yield record(root, None)
+            for _ in range(min(fanout, n - i)):
+                i += 1
+                yield record(i, root)
+    elif shape == "deep":
+        # łańcuchy o długości `depth`
+        for i in range(1, n + 1):
+            yield record(i, None if (i - 1) % depth == 0 else i - 1)
+    else:
+        # losowe drzewo: rodzic wybierany spośród ostatnich węzłów, ~5% korzeni
+        for i in range(1, n + 1):
+            parent = None if i == 1 or rng.random() < 0.05 else rng.randint(max(1, i - fanout * 10), i - 1)
+            yield record(i, parent)
+
+
+def seed(shape: str, n: int, fanout: int, depth: int, rng: random.Random, reset: bool) -> float:
+    with tm.connect() as conn:
+        tm.init_db(conn)
+        if reset:
+            conn.execute("TRUNCATE tasks, task_changes RESTART IDENTITY")
+            conn.commit()
+        fd, path = tempfile.mkstemp(suffix=".jsonl")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                for rec in generate_tree(shape, n, fanout, depth, rng):
+                    f.write(json.dumps(rec) + "\n")
+            t0 = time.perf_counter()
+            tm.import_tasks(conn, path)
+            return time.perf_counter() - t0
+        finally:
+            os.unlink(path)
+
+
+def sample_ids(limit: int = 100_000) -> List[int]:
+    with tm.connect() as conn:
+        rows = conn.execute("SELECT id FROM tasks ORDER BY random() LIMIT %s", (limit,)).fetchall()
+    return [r["id"] for r in rows]
+
+
+def make_payload(op: str, ids: List[int], rng: random.Random) -> Dict[str, Any]:
+    if op == "add":
+        return {"command": "add", "title": "bench", "priority": rng.randint(1, 3),
+                "estimate_min": rng.randint(0, 60), "parent_id": rng.choice(ids)}
+    if op == "list":
+        return {"command": "list", "parent_id": rng.choice(ids) if rng.random() < 0.9 else None}
+    if op == "show":
+        return {"command": "show", "id": rng.choice(ids)}
+    return {"command": "update", "id": rng.choice(ids),
+            "fields": {"status": rng.choice(("todo", "in_progress", "done")), "priority": rng.randint(1, 3)}}
+
+
+def run_op(op: str, count: int, threads: int, ids: List[int], rng: random.Random) -> Dict[str, Any]:
+    payloads = [make_payload(op, ids, rng) for _ in range(count)]
+    hist = tm.LatencyHistogram()
+    errors = 0
+
+    def one(p):
+        t0 = time.perf_counter()
+        res = tm.chat_call(p, pooled=True)
+        return time.perf_counter() - t0, res.get("status") == "ok"
+
+    t0 = time.perf_counter()
+    if threads > 1:
+        with ThreadPoolExecutor(max_workers=threads) as ex:
+            results = list(ex.map(one, payloads))
+    else:
+        results = [one(p) for p in payloads]
+    elapsed = time.perf_counter() - t0
+
+    for dt, ok in results:
+        hist.record(dt)
+        errors += not ok
+    return {"ops": count, "errors": errors, "ops_per_s": count / elapsed, **hist.summary()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark task managera (wymaga DATABASE_URL)")
+    parser.add_argument("--shape", choices=("wide", "deep", "mixed"), default="mixed")
+    parser.add_argument("--tasks", type=int, default=10_000, help="Liczba zasiewanych zadań")
+    parser.add_argument("--fanout", type=int, default=50, help="Liczba dzieci na węzeł (wide/mixed)")
+    parser.add_argument("--depth", type=int, default=100, help="Długość łańcucha (deep)")
+    parser.add_argument("--ops", type=int, default=1000, help="Liczba operacji każdego typu")
+    parser.add_argument("--threads", type=int, default=1, help="Równoległe wątki klienta")
+    parser.add_argument("--seed", type=int, default=42, help="Ziarno generatora (powtarzalność)")
+    parser.add_argument("--reset", action="store_true", help="Wyczyść tabele przed zasiewem")
+    parser.add_argument("--json", help="Zapisz wynik do pliku JSON")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    if args.threads > tm.POOL_MAX_SIZE:
+        print(f"UWAGA: --threads {args.threads} > TASKS_POOL_MAX_SIZE {tm.POOL_MAX_SIZE}, część czasu to oczekiwanie na pulę")
+
+    seed_s = seed(args.shape, args.tasks, args.fanout, args.depth, rng, args.reset)
+    print(f"Zasiew ({args.shape}, {args.tasks} zadań): {seed_s:.2f} s")
+    ids = sample_ids()
+
+    metrics = tm.enable_metrics()
+    report: Dict[str, Any] = {"config": vars(args), "seed_s": seed_s, "ops": {}}
+    print(f"{'op':<8}{'ops/s':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}{'błędy':>8}")
+    for op in OPS:
+        r = run_op(op, args.ops, args.threads, ids, rng)
+        report["ops"][op] = r
+        print(f"{op:<8}{r['ops_per_s']:>10.1f}{r['p50_ms']:>10.2f}{r['p90_ms']:>10.2f}"
+              f"{r['p99_ms']:>10.2f}{r['max_ms']:>10.2f}{r['errors']:>8}")
+    report["phases"] = metrics.snapshot()
+    report["pool"] = tm.pool_stats()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Zapisano {args.json}")
+
+
+if __name__ == "__main__":
+    main()
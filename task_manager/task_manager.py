@@ -5,27 +5,35 @@
 
 from __future__ import annotations
 import os
-from dataclasses import dataclass, asdict
-from datetime import datetime
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
 from enum import Enum
-from typing import Optional, List, Tuple, Dict, Any
+from typing import Optional, List, Tuple, Dict, Any, Callable, Sequence
 import shlex
 import json
+import re
+from functools import lru_cache
+import csv
+import base64
+from itertools import islice
+import threading
+import atexit
+import time
+import uuid
+import math
+import weakref
+import contextvars
+from contextlib import contextmanager, nullcontext, ExitStack
+import heapq
+from collections import OrderedDict, defaultdict
 from dotenv import load_dotenv
 
 import psycopg
 from psycopg.rows import dict_row
+from psycopg_pool import ConnectionPool
 
 load_dotenv()
 
-DATE_FORMATS = [
-"%Y-%m-%d %H:%M",
-"%Y-%m-%d",
-"%Y/%m/%d %H:%M",
-"%Y/%m/%d",
-"%d.%m.%Y %H:%M",
-"%d.%m.%Y",
-]
 
 class TaskPriority(int, Enum):
     LOW = 1
@@ -37,47 +45,394 @@ class TaskStatus(str, Enum):
     IN_PROGRESS = 'in_progress'
     DONE = 'done'
 
-def parse_when(text: Optional[str]) -> Optional[datetime]:
+_DASH_RE = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})(?:[ T](\d{1,2}):(\d{2}))?")
+_SLASH_RE = re.compile(r"(\d{4})/(\d{1,2})/(\d{1,2})(?: (\d{1,2}):(\d{2}))?")
+_DOT_RE = re.compile(r"(\d{1,2})\.(\d{1,2})\.(\d{4})(?: (\d{1,2}):(\d{2}))?")
+_REL_DAY_RE = re.compile(r"(today|tomorrow|yesterday|now|dziś|dzisiaj|jutro|wczoraj|teraz)(?:\s+(\d{1,2}):(\d{2}))?", re.I)
+_OFFSET_RE = re.compile(r"([+-])\s*(\d+)\s*([mhdw])", re.I)
+
+_REL_DAYS = {"today": 0, "dziś": 0, "dzisiaj": 0, "tomorrow": 1, "jutro": 1, "yesterday": -1, "wczoraj": -1}
+_OFFSET_UNITS = {"m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+
+def _build_dt(y, mo, d, h, mi) -> datetime:
+    return datetime(int(y), int(mo), int(d), int(h or 0), int(mi or 0))
+
+@lru_cache(maxsize=4096)
+def _parse_absolute(t: str) -> datetime:
+    """Daty bezwzględne - wybór parsera po kształcie napisu, wynik zapamiętywany."""
+    if len(t) >= 10 and t[4] == "-":
+        try:
+            dt = datetime.fromisoformat(t)
+        except ValueError:
+            dt = None
+        if dt is not None:
+            # kolumny są TIMESTAMP bez strefy - sprowadzamy do czasu lokalnego
+            return dt.astimezone().replace(tzinfo=None) if dt.tzinfo else dt
+    c = t[4:5]
+    if c == "-":
+        m = _DASH_RE.fullmatch(t)
+        if m:
+            return _build_dt(*m.groups())
+    elif c == "/":
+        m = _SLASH_RE.fullmatch(t)
+        if m:
+            return _build_dt(*m.groups())
+    else:
+        m = _DOT_RE.fullmatch(t)
+        if m:
+            d, mo, y, h, mi = m.groups()
+            return _build_dt(y, mo, d, h, mi)
+    raise ValueError(t)
+
+def _parse_relative(t: str) -> Optional[datetime]:
+    m = _OFFSET_RE.fullmatch(t)
+    if m:
+        sign, n, unit = m.groups()
+        delta = timedelta(**{_OFFSET_UNITS[unit.lower()]: int(n)})
+        return now_dt() + delta if sign == "+" else now_dt() - delta
+    m = _REL_DAY_RE.fullmatch(t)
+    if m:
+        word, h, mi = m.groups()
+        word = word.lower()
+        if word in ("now", "teraz"):
+            return None if h else now_dt()
+        day = datetime.combine(datetime.now().date(), datetime.min.time()) + timedelta(days=_REL_DAYS[word])
+        return day.replace(hour=int(h or 0), minute=int(mi or 0))
+    return None
+
+def parse_when(text: Any) -> Optional[datetime]:
+    """Jedyny parser dat w module (komendy, update, import).
+
+    Obsługuje daty 'YYYY-MM-DD', 'YYYY/MM/DD', 'DD.MM.YYYY' (każdą opcjonalnie z ' HH:MM'),
+    pełne ISO 8601 oraz wyrażenia względne:
+    today/dziś, tomorrow/jutro, yesterday/wczoraj (opcjonalnie z godziną, np. 'tomorrow 14:00'),
+    now/teraz i przesunięcia '+3d', '-2h', '+30m', '+1w'.
+    """
     if not text:
         return None
+    if isinstance(text, datetime):
+        return text
     t = text.strip()
-    for fmt in DATE_FORMATS:
-        try:
-            return datetime.strptime(t,fmt)
-        except ValueError:
-            continue
-    raise ValueError(f"Niepoprawny format daty/czasu: '{text}'")
+    try:
+        dt = _parse_absolute(t) if t[:1].isdigit() else _parse_relative(t)
+    except ValueError:
+        dt = None
+    if dt is None:
+        raise ValueError(f"Niepoprawny format daty/czasu: '{text}'")
+    return dt
 
-def connect(db_url: Optional[str] = None) -> psycopg.Connection:
+def _resolve_url(db_url: Optional[str] = None) -> str:
     url = db_url or os.getenv("DATABASE_URL")
     if not url:
         raise RuntimeError("Brak DATABASE_URL. Ustaw zmienną w pliku .env")
-    return psycopg.connect(url, autocommit=False, row_factory=dict_row)
+    return url
+
+def connect(db_url: Optional[str] = None) -> psycopg.Connection:
+    return psycopg.connect(_resolve_url(db_url), autocommit=False, row_factory=dict_row)
+
+# klucz sortowania: priority DESC, due_at ASC NULLS LAST, id - zapisany rosnąco,
+# żeby dało się go porównywać jako wiersz (keyset) i wspierać jednym indeksem
+_ORDER_KEY = "(-priority), (COALESCE(due_at, 'infinity'::timestamp)), id"
+
+# konfiguracja tsvector; zmiana wymaga odtworzenia kolumny search_tsv
+FTS_CONFIG = os.getenv("TASKS_FTS_CONFIG", "simple")
+
+JOURNAL_LOCK_KEY = 0x7461736B  # 'task'
+# init_db w kilku procesach naraz (CREATE ... IF NOT EXISTS, ALTER TABLE) kończy się błędami
+# duplicate key w pg_type/pg_class albo "tuple concurrently updated" - blokada je szereguje
+SCHEMA_LOCK_KEY = 0x7363686D  # 'schm'
+_SCHEMA_LOCK_SQL = "SELECT pg_advisory_xact_lock(%s)"
+
+_SCHEMA_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS tasks (
+    id BIGSERIAL PRIMARY KEY,
+    parent_id BIGINT REFERENCES tasks(id) ON DELETE CASCADE,
+    title TEXT NOT NULL,
+    description TEXT DEFAULT '',
+    due_at TIMESTAMP,
+    estimate_min INTEGER DEFAULT 0,
+    priority INTEGER DEFAULT 2 CHECK (priority IN (1,2,3)),
+    status TEXT NOT NULL DEFAULT 'todo' CHECK (status IN ('todo','in_progress','done')),
+    created_at TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP NOT NULL
+    );
+    """,
+    # indeksy pod kolejność listowania (priority DESC, due_at ASC NULLS LAST, id) i paginację po kluczu
+    f"""
+    CREATE INDEX IF NOT EXISTS tasks_parent_order_idx
+    ON tasks (parent_id, {_ORDER_KEY})
+    """,
+    f"""
+    CREATE INDEX IF NOT EXISTS tasks_status_order_idx
+    ON tasks (status, {_ORDER_KEY})
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS tasks_open_due_idx
+    ON tasks (due_at)
+    WHERE status <> 'done' AND due_at IS NOT NULL
+    """,
+    # wyszukiwanie pełnotekstowe: tytuł ważniejszy (A) niż opis (B);
+    # ALTER TABLE bierze ACCESS EXCLUSIVE jeszcze przed sprawdzeniem IF NOT EXISTS, więc przy
+    # każdym starcie czekałby na trwające transakcje i blokował odczyty - najpierw pg_attribute
+    f"""
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_attribute WHERE attrelid = 'tasks'::regclass
+                       AND attname = 'search_tsv' AND NOT attisdropped) THEN
+            ALTER TABLE tasks ADD COLUMN search_tsv tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('{FTS_CONFIG}'::regconfig, coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('{FTS_CONFIG}'::regconfig, coalesce(description, '')), 'B')
+            ) STORED;
+        END IF;
+    END
+    $$
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS tasks_search_idx
+    ON tasks USING gin (search_tsv)
+    """,
+    # dziennik zmian dla synchronizacji przyrostowej (changes since=<seq>)
+    """
+    CREATE TABLE IF NOT EXISTS task_changes (
+    seq BIGSERIAL PRIMARY KEY,
+    task_id BIGINT NOT NULL,
+    op TEXT NOT NULL CHECK (op IN ('insert','update','delete')),
+    changed_at TIMESTAMP NOT NULL DEFAULT now()
+    );
+    """,
+    # wyzwalacz odroczony do commitu: blokada doradcza sprawia, że transakcje dostają numery
+    # seq w kolejności zatwierdzania, więc klient nie przeskoczy zmian z wolniejszej transakcji
+    f"""
+    CREATE OR REPLACE FUNCTION tasks_journal() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        PERFORM pg_advisory_xact_lock({JOURNAL_LOCK_KEY});
+        IF TG_OP = 'DELETE' THEN
+            INSERT INTO task_changes(task_id, op) VALUES (OLD.id, 'delete');
+        ELSE
+            INSERT INTO task_changes(task_id, op) VALUES (NEW.id, lower(TG_OP));
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    # usunięcia kaskadowe (ON DELETE CASCADE) też odpalają wyzwalacz wierszowy, więc dają tombstone
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'tasks_journal_trg'
+                       AND tgrelid = 'tasks'::regclass) THEN
+            CREATE CONSTRAINT TRIGGER tasks_journal_trg
+            AFTER INSERT OR UPDATE OR DELETE ON tasks
+            DEFERRABLE INITIALLY DEFERRED
+            FOR EACH ROW EXECUTE FUNCTION tasks_journal();
+        END IF;
+    END
+    $$
+    """,
+]
+
+# opcjonalne - wymaga uprawnień do rozszerzenia pg_trgm
+_TRGM_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE INDEX IF NOT EXISTS tasks_title_trgm_idx
+    ON tasks USING gin (title gin_trgm_ops)
+    """,
+]
 
 def init_db(conn: psycopg.Connection) -> None:
     with conn.cursor() as cur:
-        cur.execute(
-            """
-                CREATE TABLE IF NOT EXISTS tasks (
-                id BIGSERIAL PRIMARY KEY,
-                parent_id BIGINT REFERENCES tasks(id) ON DELETE CASCADE,
-                title TEXT NOT NULL,
-                description TEXT DEFAULT '',
-                due_at TIMESTAMP,
-                estimate_min INTEGER DEFAULT 0,
-                priority INTEGER DEFAULT 2 CHECK (priority IN (1,2,3)),
-                status TEXT NOT NULL DEFAULT 'todo' CHECK (status IN ('todo','in_progress','done')),
-                created_at TIMESTAMP NOT NULL,
-                updated_at TIMESTAMP NOT NULL
-                );
-                """
-            )
+        cur.execute(_SCHEMA_LOCK_SQL, (SCHEMA_LOCK_KEY,))
+        for sql in _SCHEMA_SQL:
+            cur.execute(sql)
+        try:
+            with conn.transaction():
+                for sql in _TRGM_SQL:
+                    cur.execute(sql)
+        except psycopg.Error:
+            # brak uprawnień do rozszerzenia - filtr po tytule działa wtedy bez indeksu
+            pass
     conn.commit()
+
+_SCHEMA_READY: set = set()
+_SCHEMA_LOCK = threading.Lock()
+
+def ensure_schema(conn: psycopg.Connection, db_url: Optional[str] = None) -> None:
+    """Wywołuje init_db tylko raz na proces dla danej bazy."""
+    url = _resolve_url(db_url)
+    if url in _SCHEMA_READY:
+        return
+    with _SCHEMA_LOCK:
+        if url not in _SCHEMA_READY:
+            init_db(conn)
+            _SCHEMA_READY.add(url)
+
+
+# pula połączeń
+
+POOL_MIN_SIZE = int(os.getenv("TASKS_POOL_MIN_SIZE", "1"))
+POOL_MAX_SIZE = int(os.getenv("TASKS_POOL_MAX_SIZE", "10"))
+POOL_MAX_IDLE = float(os.getenv("TASKS_POOL_MAX_IDLE", "300"))
+POOL_TIMEOUT = float(os.getenv("TASKS_POOL_TIMEOUT", "30"))
+
+_POOLS: Dict[str, ConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+def get_pool(db_url: Optional[str] = None,
+             min_size: Optional[int] = None,
+             max_size: Optional[int] = None,
+             max_idle: Optional[float] = None) -> ConnectionPool:
+    """Zwraca długo żyjącą pulę połączeń dla danej bazy (tworzy ją przy pierwszym użyciu)."""
+    url = _resolve_url(db_url)
+    pool = _POOLS.get(url)
+    if pool is not None:
+        return pool
+    with _POOLS_LOCK:
+        pool = _POOLS.get(url)
+        if pool is None:
+            pool = ConnectionPool(
+                url,
+                min_size=min_size if min_size is not None else POOL_MIN_SIZE,
+                max_size=max_size if max_size is not None else POOL_MAX_SIZE,
+                max_idle=max_idle if max_idle is not None else POOL_MAX_IDLE,
+                timeout=POOL_TIMEOUT,
+                kwargs={"autocommit": False, "row_factory": dict_row},
+                name="tasks",
+                open=True,
+            )
+            _POOLS[url] = pool
+    return pool
+
+def pool_stats(db_url: Optional[str] = None) -> Dict[str, Any]:
+    """Statystyki puli: liczba pobrań, oczekiwań i łączny czas oczekiwania."""
+    pool = _POOLS.get(_resolve_url(db_url))
+    if pool is None:
+        return {"checkouts": 0, "waits": 0, "wait_ms": 0, "size": 0, "available": 0, "max_size": 0}
+    st = pool.get_stats()
+    return {
+        "checkouts": st.get("requests_num", 0),
+        "waits": st.get("requests_queued", 0),
+        "wait_ms": st.get("requests_wait_ms", 0),
+        "errors": st.get("requests_errors", 0),
+        "size": st.get("pool_size", 0),
+        "available": st.get("pool_available", 0),
+        "max_size": st.get("pool_max", 0),
+    }
+
+@atexit.register
+def close_pools() -> None:
+    with _POOLS_LOCK:
+        for pool in _POOLS.values():
+            pool.close()
+        _POOLS.clear()
+
+
+# pomiary czasu
+
+class LatencyHistogram:
+    """Histogram czasów z koszykami rosnącymi geometrycznie - stała pamięć, percentyle z błędem ~2.5%."""
+
+    GROWTH = 1.05
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = defaultdict(int)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        us = max(seconds * 1e6, 1.0)
+        self.buckets[int(math.log(us, self.GROWTH))] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        """Percentyl q (0..1) w milisekundach."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for idx in sorted(self.buckets):
+            seen += self.buckets[idx]
+            if seen >= rank:
+                return min(self.GROWTH ** (idx + 0.5) / 1000, self.max * 1000)
+        return self.max * 1000
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": self.total * 1000 / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(0.50),
+            "p90_ms": self.percentile(0.90),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": self.max * 1000,
+        }
+
+class LatencyMetrics:
+    """Czasy faz (connect, init_db, query, decode, serialize, handler, total) per komenda."""
+
+    def __init__(self):
+        self._hist: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, command: str, phase: str, seconds: float) -> None:
+        with self._lock:
+            h = self._hist.get((command, phase))
+            if h is None:
+                h = self._hist[(command, phase)] = LatencyHistogram()
+            h.record(seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        out: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        with self._lock:
+            for (command, phase), h in sorted(self._hist.items()):
+                out.setdefault(command, {})[phase] = h.summary()
+        return out
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.snapshot(), **kwargs)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hist.clear()
+
+METRICS: Optional[LatencyMetrics] = None
+_CURRENT_COMMAND = contextvars.ContextVar("tasks_command", default="-")
+_NO_PHASE = nullcontext()
+
+def enable_metrics() -> LatencyMetrics:
+    """Włącza pomiar czasów faz (domyślnie wyłączony - wtedy narzut to jedno sprawdzenie None)."""
+    global METRICS
+    METRICS = LatencyMetrics()
+    return METRICS
+
+def disable_metrics() -> None:
+    global METRICS
+    METRICS = None
+
+def metrics_snapshot() -> Optional[Dict[str, Any]]:
+    return METRICS.snapshot() if METRICS is not None else None
+
+@contextmanager
+def _timed(metrics: LatencyMetrics, name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.record(_CURRENT_COMMAND.get(), name, time.perf_counter() - t0)
+
+def _phase(name: str):
+    metrics = METRICS
+    return _NO_PHASE if metrics is None else _timed(metrics, name)
     
 def now_dt() -> datetime:
     return datetime.now().replace(microsecond=0)
 
-@dataclass
+@dataclass(slots=True)
 class Task:
     id: int
     parent_id: Optional[int]
@@ -106,30 +461,366 @@ class Task:
         )
 
 
+# szybkie dekodowanie wierszy
+
+TASK_FIELDS = ("id", "parent_id", "title", "description", "due_at", "estimate_min",
+               "priority", "status", "created_at", "updated_at")
+
+def _task_cols(alias: str = "") -> str:
+    """Jawna lista kolumn zadania (bez search_tsv, którego nie ma sensu przesyłać)."""
+    return ",".join(alias + f for f in TASK_FIELDS)
+
+# słowniki zamiast TaskPriority(v)/TaskStatus(v) - wywołanie Enum jest wolne przy dużej liczbie wierszy
+_PRIORITY_BY_VALUE = {p.value: p for p in TaskPriority}
+_STATUS_BY_VALUE = {s.value: s for s in TaskStatus}
+
+def _field_indexes(cursor) -> Optional[List[int]]:
+    if cursor.description is None:
+        return None
+    names = [c.name for c in cursor.description]
+    try:
+        return [names.index(f) for f in TASK_FIELDS]
+    except ValueError as e:
+        raise ValueError(f"Wynik zapytania nie zawiera kolumn zadania: {names}") from e
+
+def task_row(cursor) -> Callable[[Sequence[Any]], Task]:
+    """Row factory psycopg budująca Task bezpośrednio z krotki wiersza, bez pośredniego dict."""
+    idx = _field_indexes(cursor)
+    if idx is None:
+        return tuple
+    i_id, i_par, i_title, i_desc, i_due, i_est, i_prio, i_st, i_cr, i_up = idx
+    prio, st = _PRIORITY_BY_VALUE, _STATUS_BY_VALUE
+
+    def make(v: Sequence[Any]) -> Task:
+        return Task(v[i_id], v[i_par], v[i_title], v[i_desc], v[i_due], v[i_est],
+                    prio[v[i_prio]], st[v[i_st]], v[i_cr], v[i_up])
+    return make
+
+def _iso(dt: Optional[datetime]) -> Optional[str]:
+    return dt.isoformat() if dt is not None else None
+
+def task_json_row(cursor) -> Callable[[Sequence[Any]], Dict[str, Any]]:
+    """Row factory zwracająca od razu słownik gotowy do json.dumps (daty ISO, priority int, status str)."""
+    idx = _field_indexes(cursor)
+    if idx is None:
+        return tuple
+    i_id, i_par, i_title, i_desc, i_due, i_est, i_prio, i_st, i_cr, i_up = idx
+
+    def make(v: Sequence[Any]) -> Dict[str, Any]:
+        due = v[i_due]
+        return {
+            "id": v[i_id],
+            "parent_id": v[i_par],
+            "title": v[i_title],
+            "description": v[i_desc],
+            "due_at": due.isoformat() if due is not None else None,
+            "estimate_min": v[i_est],
+            "priority": v[i_prio],
+            "status": v[i_st],
+            "created_at": v[i_cr].isoformat(),
+            "updated_at": v[i_up].isoformat(),
+        }
+    return make
+
+def task_to_dict(t: Task) -> Dict[str, Any]:
+    """Płytka kopia pól zadania - te same wartości co asdict(), ale bez głębokiego kopiowania."""
+    return {
+        "id": t.id,
+        "parent_id": t.parent_id,
+        "title": t.title,
+        "description": t.description,
+        "due_at": t.due_at,
+        "estimate_min": t.estimate_min,
+        "priority": t.priority,
+        "status": t.status,
+        "created_at": t.created_at,
+        "updated_at": t.updated_at,
+    }
+
+def task_to_json(t: Task) -> Dict[str, Any]:
+    """Słownik gotowy do json.dumps (daty jako ISO 8601, enumy jako wartości)."""
+    return {
+        "id": t.id,
+        "parent_id": t.parent_id,
+        "title": t.title,
+        "description": t.description,
+        "due_at": _iso(t.due_at),
+        "estimate_min": t.estimate_min,
+        "priority": t.priority.value,
+        "status": t.status.value,
+        "created_at": _iso(t.created_at),
+        "updated_at": _iso(t.updated_at),
+    }
+
+
+# cache odczytów
+
+CACHE_MAX_SIZE = int(os.getenv("TASKS_CACHE_SIZE", "10000"))
+CACHE_TTL = float(os.getenv("TASKS_CACHE_TTL", "60"))
+CACHE_NOTIFY_CHANNEL = "tasks_cache"
+_NOTIFY_SQL = "SELECT pg_notify(%s, %s)"
+_NOTIFY_MAX_BYTES = 7900  # limit payloadu NOTIFY to 8000 bajtów
+
+class TaskCache:
+    """Cache LRU z TTL przed get_task/list_tasks.
+
+    Klucze: ("task", id) -> Task oraz ("list", parent_id) -> List[Task]. Dla każdego
+    zadania obecnego w cache pamiętany jest jego rodzic, więc zapis unieważnia dokładnie
+    te wpisy, w których zadanie może występować.
+    """
+
+    def __init__(self, maxsize: int = CACHE_MAX_SIZE, ttl: float = CACHE_TTL, notify: bool = False):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.notify = notify
+        self.source = uuid.uuid4().hex
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[Tuple[str, Any], Tuple[float, Any, List[Tuple[int, Optional[int]]]]]" = OrderedDict()
+        self._parent_of: Dict[int, Optional[int]] = {}
+        self._refs: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, Any]) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Tuple[str, Any], value: Any, tasks: List[Task]) -> None:
+        ids = [(t.id, t.parent_id) for t in tasks]
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, ids)
+            for tid, pid in ids:
+                self._refs[tid] = self._refs.get(tid, 0) + 1
+                self._parent_of[tid] = pid
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key) -> None:
+        _, _, ids = self._entries.pop(key)
+        for tid, _ in ids:
+            n = self._refs[tid] - 1
+            if n:
+                self._refs[tid] = n
+            else:
+                del self._refs[tid]
+                self._parent_of.pop(tid, None)
+
+    @staticmethod
+    def update_keys(task_id: int, fields: Dict[str, Any],
+                    old_parent: Optional[int]) -> Tuple[List[int], List[Optional[int]]]:
+        """Wpisy do unieważnienia po update: samo zadanie, lista starego i ewentualnie nowego rodzica.
+
+        Stary rodzic pochodzi z bazy (RETURNING), a nie z lokalnego cache - inne procesy mogą
+        mieć jego listę, nawet jeśli ten proces nie ma zadania w cache.
+        """
+        lists = [old_parent]
+        if "parent_id" in fields and fields["parent_id"] != old_parent:
+            lists.append(fields["parent_id"])
+        return [task_id], lists
+
+    def drop(self, tasks=(), lists=(), everything: bool = False) -> None:
+        """Usuwa wpisy tylko z lokalnego cache (bez NOTIFY)."""
+        with self._lock:
+            if everything:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                self._parent_of.clear()
+                self._refs.clear()
+                return
+            for key in [("task", t) for t in tasks] + [("list", p) for p in lists]:
+                if key in self._entries:
+                    self._drop(key)
+                    self.invalidations += 1
+
+    def invalidate(self, tasks=(), lists=()) -> Optional[str]:
+        """Usuwa wpisy i zwraca payload NOTIFY dla innych procesów (albo None)."""
+        tasks, lists = list(tasks), list(lists)
+        self.drop(tasks, lists)
+        return self.payload(tasks, lists)
+
+    def clear(self) -> Optional[str]:
+        self.drop(everything=True)
+        return self.payload(everything=True)
+
+    def payload(self, tasks=(), lists=(), everything: bool = False) -> Optional[str]:
+        """Payload NOTIFY opisujący unieważnienie (None, gdy notify jest wyłączone)."""
+        if not self.notify:
+            return None
+        if not everything:
+            payload = json.dumps({"src": self.source, "tasks": list(tasks), "lists": list(lists)})
+            if len(payload) <= _NOTIFY_MAX_BYTES:
+                return payload
+        return json.dumps({"src": self.source, "all": True})
+
+    def apply_notification(self, payload: str) -> None:
+        """Unieważnienie przysłane przez inny proces przez LISTEN/NOTIFY."""
+        msg = json.loads(payload)
+        if msg.get("src") == self.source:
+            return
+        tasks = msg.get("tasks", ())
+        lists = list(msg.get("lists", ()))
+        with self._lock:
+            # listy, w których ten proces ma zapamiętane zadanie (nadawca mógł ich nie znać)
+            lists.extend(self._parent_of[t] for t in tasks if t in self._parent_of)
+        self.drop(tasks, lists, bool(msg.get("all")))
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "size": len(self._entries),
+        }
+
+TASK_CACHE: Optional[TaskCache] = None
+
+def enable_cache(maxsize: int = CACHE_MAX_SIZE, ttl: float = CACHE_TTL,
+                 notify: bool = False, listen: bool = False, db_url: Optional[str] = None) -> TaskCache:
+    """Włącza cache odczytów w procesie.
+
+    notify=True wysyła unieważnienia przez NOTIFY (dostarczane po commicie),
+    listen=True uruchamia wątek odbierający unieważnienia z innych procesów.
+    """
+    global TASK_CACHE
+    TASK_CACHE = TaskCache(maxsize=maxsize, ttl=ttl, notify=notify)
+    if listen:
+        start_cache_listener(TASK_CACHE, db_url)
+    return TASK_CACHE
+
+def disable_cache() -> None:
+    global TASK_CACHE
+    TASK_CACHE = None
+
+def cache_stats() -> Optional[Dict[str, Any]]:
+    return TASK_CACHE.stats() if TASK_CACHE is not None else None
+
+def start_cache_listener(cache: TaskCache, db_url: Optional[str] = None) -> threading.Thread:
+    url = _resolve_url(db_url)
+
+    def run():
+        with psycopg.connect(url, autocommit=True) as conn:
+            conn.execute(f"LISTEN {CACHE_NOTIFY_CHANNEL}")
+            for n in conn.notifies():
+                cache.apply_notification(n.payload)
+
+    t = threading.Thread(target=run, name="tasks-cache-listener", daemon=True)
+    t.start()
+    return t
+
+# unieważnienia lokalnego cache odłożone do końca transakcji połączenia
+_PENDING_INVALIDATIONS: "weakref.WeakKeyDictionary[Any, List[Tuple[List[int], List[Optional[int]], bool]]]" = \
+    weakref.WeakKeyDictionary()
+_PENDING_LOCK = threading.Lock()
+
+def _cache_defer(conn, tasks=(), lists=(), everything: bool = False) -> Optional[str]:
+    """Zapamiętuje unieważnienie do wykonania po commicie i zwraca payload NOTIFY.
+
+    Wyczyszczenie cache przed commitem zostawia okno, w którym odczyt z innego połączenia
+    widzi jeszcze stare wiersze i zapisuje je w cache na cały TTL. NOTIFY może iść w
+    transakcji (PostgreSQL dostarcza go dopiero po commicie), lokalne wpisy usuwa _cache_flush.
+    """
+    cache = TASK_CACHE
+    if cache is None:
+        return None
+    with _PENDING_LOCK:
+        _PENDING_INVALIDATIONS.setdefault(conn, []).append((list(tasks), list(lists), everything))
+    return cache.payload(tasks, lists, everything)
+
+def _cache_flush(conn) -> None:
+    """Wykonuje unieważnienia odłożone na połączeniu - po commicie (albo rollbacku, wtedy nadmiarowo)."""
+    with _PENDING_LOCK:
+        pending = _PENDING_INVALIDATIONS.pop(conn, None)
+    cache = TASK_CACHE
+    if not pending or cache is None:
+        return
+    for tasks, lists, everything in pending:
+        cache.drop(tasks, lists, everything)
+
+def _cache_usable(conn) -> bool:
+    """Czy odczyt na tym połączeniu może korzystać z cache.
+
+    Tylko poza otwartą transakcją: w transakcji odczyt widzi niezatwierdzone zmiany
+    (np. batch z commit=False), które mogą zostać wycofane, a lokalne unieważnienia
+    tych zmian czekają jeszcze na commit. Na długo żyjącym połączeniu bez autocommit
+    cache działa więc tylko po commit()/rollback().
+    """
+    if conn.info.transaction_status != psycopg.pq.TransactionStatus.IDLE:
+        return False
+    # transakcja z odłożonymi unieważnieniami już się skończyła (np. commit wykonany przez wołającego)
+    _cache_flush(conn)
+    return True
+
+def _cache_invalidate(conn, tasks=(), lists=(), everything: bool = False) -> None:
+    """NOTIFY w bieżącej transakcji; lokalny cache jest czyszczony dopiero po commicie (_cache_flush)."""
+    payload = _cache_defer(conn, tasks, lists, everything)
+    if payload:
+        with conn.cursor() as cur:
+            cur.execute(_NOTIFY_SQL, (CACHE_NOTIFY_CHANNEL, payload))
+
+# całe poddrzewo (id, parent_id) - potrzebne do unieważnienia kaskadowego usunięcia
+_SUBTREE_SQL = """
+    WITH RECURSIVE sub AS (
+        SELECT id, parent_id, ARRAY[id] AS path FROM tasks WHERE id = %s
+        UNION ALL
+        SELECT c.id, c.parent_id, sub.path || c.id
+        FROM tasks c JOIN sub ON c.parent_id = sub.id
+        WHERE NOT c.id = ANY(sub.path)
+    )
+    SELECT id, parent_id FROM sub
+    """
+
+def _delete_keys(rows) -> Tuple[List[int], List[Optional[int]]]:
+    ids = [r["id"] for r in rows]
+    lists: List[Optional[int]] = list(ids)
+    if rows:
+        lists.append(rows[0]["parent_id"])
+    return ids, lists
+
+
 # CRUD
 
 #Create
 
-def add_task(conn, title, description="", due_at=None, estimate_min=0, priority=TaskPriority.NORMAL, parent_id=None) -> int:
+_INSERT_SQL = """
+    INSERT INTO tasks(parent_id,title,description,due_at,estimate_min,priority,status,created_at,updated_at)
+    VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
+    RETURNING id
+    """
+
+def _insert_params(title, description, due_at, estimate_min, priority, parent_id) -> Tuple:
     ts = now_dt()
+    return (parent_id, title, description, due_at, estimate_min, TaskPriority(priority).value, TaskStatus.TODO.value, ts, ts)
+
+def add_task(conn, title, description="", due_at=None, estimate_min=0, priority=TaskPriority.NORMAL, parent_id=None, commit=True) -> int:
     with conn.cursor() as cur:
-        cur.execute(
-            """
-            INSERT INTO tasks(parent_id,title,description,due_at,estimate_min,priority,status,created_at,updated_at)
-            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
-            RETURNING id
-            """,
-            (parent_id, title, description, due_at, estimate_min, priority.value, TaskStatus.TODO.value, ts, ts)
-        )
+        cur.execute(_INSERT_SQL, _insert_params(title, description, due_at, estimate_min, priority, parent_id))
         new_id = cur.fetchone()["id"]
-    conn.commit()
+    _cache_invalidate(conn, lists=[parent_id])
+    if commit:
+        conn.commit()
+        _cache_flush(conn)
     return new_id
 
 #Update
 
-def update_task(conn, task_id: int, **fields):
-    if not fields:
-        return
+def _update_query(task_id: int, fields: Dict[str, Any]) -> Tuple[str, List[Any]]:
     allowed = {"title", "description", "due_at", "estimate_min", "priority", "status", "parent_id"}
     
     sets = []
@@ -148,78 +839,837 @@ def update_task(conn, task_id: int, **fields):
         sets.append(f"{k}=%s")
         
     sets.append("updated_at=%s")
-    vals.extend([now_dt(), task_id])
+    vals.extend([now_dt(), task_id, task_id])
     
-    q = f"UPDATE tasks SET {','.join(sets)} WHERE id=%s"
+    # stary rodzic z bazy (blokada wiersza przed zmianą) - jego lista musi zostać unieważniona
+    # także w procesach, które go nie znają
+    return (f"UPDATE tasks SET {','.join(sets)} "
+            f"FROM (SELECT parent_id FROM tasks WHERE id=%s FOR UPDATE) prev "
+            f"WHERE tasks.id=%s RETURNING prev.parent_id AS old_parent_id"), vals
+
+def update_task(conn, task_id: int, commit=True, **fields):
+    if not fields:
+        return
+    q, vals = _update_query(task_id, fields)
     with conn.cursor() as cur:
         cur.execute(q, vals)
-    conn.commit()
+        row = cur.fetchone()
+    if TASK_CACHE is not None and row is not None:
+        _cache_invalidate(conn, *TASK_CACHE.update_keys(task_id, fields, row["old_parent_id"]))
+    if commit:
+        conn.commit()
+        _cache_flush(conn)
 
 #Delete
-def delete_task(conn,task_id:int):
+_DELETE_SQL = "DELETE FROM tasks WHERE id=%s"
+
+def delete_task(conn,task_id:int,commit=True):
     with conn.cursor() as cur:
-        cur.execute("DELETE FROM tasks WHERE id=%s",(task_id,))
-    conn.commit()
+        if TASK_CACHE is not None:
+            cur.execute(_SUBTREE_SQL, (task_id,))
+            rows = cur.fetchall()
+        cur.execute(_DELETE_SQL,(task_id,))
+    if TASK_CACHE is not None:
+        _cache_invalidate(conn, *_delete_keys(rows))
+    if commit:
+        conn.commit()
+        _cache_flush(conn)
     
 #Read
+_GET_SQL = f"SELECT {_task_cols()} FROM tasks WHERE id=%s"
+
 def get_task(conn, task_id: int) -> Task:
-    with conn.cursor() as cur:
-        cur.execute("SELECT * FROM tasks WHERE id=%s",(task_id,))
-        row = cur.fetchone()
-        if not row:
+    cache = TASK_CACHE
+    if cache is not None and not _cache_usable(conn):
+        cache = None
+    if cache is not None:
+        task = cache.get(("task", task_id))
+        if task is not None:
+            return task
+    with conn.cursor(row_factory=task_row) as cur:
+        with _phase("query"):
+            cur.execute(_GET_SQL,(task_id,))
+        with _phase("decode"):
+            task = cur.fetchone()
+        if not task:
             raise ValueError(f"Brak zadania {task_id}")
-    return Task.from_row(row)
+    if cache is not None:
+        cache.put(("task", task_id), task, [task])
+    return task
 
 def list_tasks(conn,parent_id:Optional[int]=None)->List[Task]:
-    query = "SELECT * FROM tasks WHERE parent_id "
-    params = [parent_id]
-    if parent_id is None:
-        query += "IS NULL "
-        params = []
-    else:
-        query += "=%s "
-    query += "ORDER BY priority DESC, due_at ASC NULLS LAST"
+    cache = TASK_CACHE
+    if cache is not None and not _cache_usable(conn):
+        cache = None
+    if cache is not None:
+        tasks = cache.get(("list", parent_id))
+        if tasks is not None:
+            return list(tasks)
+    tasks = query_tasks(conn, parent_id=parent_id)[0]
+    if cache is not None:
+        cache.put(("list", parent_id), tasks, tasks)
+    return list(tasks)
+
+def _encode_cursor(task: Task) -> str:
+    key = [-int(task.priority), task.due_at.isoformat() if task.due_at else None, task.id]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+def _decode_cursor(cursor: str) -> Tuple[int, Optional[datetime], int]:
+    try:
+        neg_prio, due, task_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return int(neg_prio), datetime.fromisoformat(due) if due else None, int(task_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Niepoprawny kursor: '{cursor}'") from e
+
+def _query_sql(parent_id: Optional[int] = None,
+               any_parent: bool = False,
+               status: Any = None,
+               priority: Any = None,
+               due_from: Optional[datetime] = None,
+               due_to: Optional[datetime] = None,
+               title: Optional[str] = None,
+               limit: Optional[int] = None,
+               cursor: Optional[str] = None) -> Tuple[str, List[Any]]:
+    where = []
+    params: List[Any] = []
+    if not any_parent:
+        if parent_id is None:
+            where.append("parent_id IS NULL")
+        else:
+            where.append("parent_id = %s")
+            params.append(parent_id)
+    if status is not None:
+        values = status if isinstance(status, (list, tuple)) else [status]
+        where.append("status = ANY(%s)")
+        params.append([TaskStatus(v).value for v in values])
+    if priority is not None:
+        values = priority if isinstance(priority, (list, tuple)) else [priority]
+        where.append("priority = ANY(%s)")
+        params.append([TaskPriority(v).value for v in values])
+    if due_from is not None:
+        where.append("due_at >= %s")
+        params.append(due_from)
+    if due_to is not None:
+        where.append("due_at <= %s")
+        params.append(due_to)
+    if title:
+        escaped = title.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        where.append("title ILIKE %s")
+        params.append(f"%{escaped}%")
+    if cursor:
+        where.append(f"({_ORDER_KEY}) > (%s, COALESCE(%s::timestamp, 'infinity'::timestamp), %s)")
+        params.extend(_decode_cursor(cursor))
+
+    query = f"SELECT {_task_cols()} FROM tasks"
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    query += f" ORDER BY {_ORDER_KEY}"
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit + 1)
+
+    return query, params
+
+def _paginate(tasks: List[Task], limit: Optional[int]) -> Tuple[List[Task], Optional[str]]:
+    next_cursor = None
+    if limit is not None and len(tasks) > limit:
+        tasks = tasks[:limit]
+        next_cursor = _encode_cursor(tasks[-1])
+    return tasks, next_cursor
+
+def query_tasks(conn,
+                parent_id: Optional[int] = None,
+                any_parent: bool = False,
+                status: Any = None,
+                priority: Any = None,
+                due_from: Optional[datetime] = None,
+                due_to: Optional[datetime] = None,
+                title: Optional[str] = None,
+                limit: Optional[int] = None,
+                cursor: Optional[str] = None) -> Tuple[List[Task], Optional[str]]:
+    """Filtrowane listowanie zadań z paginacją po kluczu (keyset).
+
+    Domyślnie zwraca jeden poziom drzewa (parent_id, None = zadania główne), any_parent=True
+    przeszukuje wszystkie poziomy. status/priority przyjmują pojedynczą wartość lub listę.
+    Zwraca (zadania, kursor następnej strony lub None).
+    """
+    query, params = _query_sql(parent_id, any_parent, status, priority, due_from, due_to, title, limit, cursor)
+    with conn.cursor(row_factory=task_row) as cur:
+        with _phase("query"):
+            cur.execute(query, params)
+        with _phase("decode"):
+            rows = cur.fetchall()
+    return _paginate(rows, limit)
+
+@dataclass
+class TaskNode:
+    task: Task
+    depth: int
+    children: List["TaskNode"] = field(default_factory=list)
+
+def _tree_sql(root_id: Optional[int]) -> str:
+    root_cond = "parent_id IS NULL" if root_id is None else "id = %(root_id)s"
+    return f"""
+        WITH RECURSIVE tree AS (
+            SELECT {_task_cols("t.")}, 0 AS depth, ARRAY[t.id] AS path
+            FROM tasks t
+            WHERE {root_cond}
+            UNION ALL
+            SELECT {_task_cols("c.")}, tree.depth + 1, tree.path || c.id
+            FROM tasks c
+            JOIN tree ON c.parent_id = tree.id
+            WHERE (%(max_depth)s::int IS NULL OR tree.depth < %(max_depth)s::int)
+              AND NOT c.id = ANY(tree.path)
+        )
+        SELECT {_task_cols()}, depth FROM tree
+        ORDER BY depth, priority DESC, due_at ASC NULLS LAST
+    """
+
+def _build_tree(rows, root_id: Optional[int]) -> List[TaskNode]:
+    # wiersze są posortowane po głębokości, więc rodzic zawsze trafia do słownika przed dziećmi
+    roots: List[TaskNode] = []
+    by_id: Dict[int, TaskNode] = {}
+    for r in rows:
+        node = TaskNode(task=Task.from_row(r), depth=r["depth"])
+        by_id[node.task.id] = node
+        parent = by_id.get(node.task.parent_id) if node.depth else None
+        if parent is None:
+            roots.append(node)
+        else:
+            parent.children.append(node)
+    if root_id is not None and not roots:
+        raise ValueError(f"Brak zadania {root_id}")
+    return roots
+
+def list_tree(conn, root_id: Optional[int] = None, max_depth: Optional[int] = None) -> List[TaskNode]:
+    """Pobiera całą hierarchię jednym zapytaniem rekurencyjnym i składa drzewo w pamięci.
+
+    root_id=None zwraca wszystkie zadania główne, max_depth ogranicza głębokość (0 = same korzenie).
+    """
+    with conn.cursor() as cur:
+        with _phase("query"):
+            cur.execute(_tree_sql(root_id), {"root_id": root_id, "max_depth": max_depth})
+        with _phase("decode"):
+            rows = cur.fetchall()
+            return _build_tree(rows, root_id)
+
+def tree_to_dicts(nodes: List[TaskNode]) -> List[Dict[str, Any]]:
+    """Zamienia drzewo na zagnieżdżone słowniki (bez rekurencji, więc działa dla głębokich drzew)."""
+    out: List[Dict[str, Any]] = []
+    stack = [(n, out) for n in reversed(nodes)]
+    while stack:
+        node, target = stack.pop()
+        d = task_to_dict(node.task)
+        d["depth"] = node.depth
+        d["children"] = []
+        target.append(d)
+        stack.extend((c, d["children"]) for c in reversed(node.children))
+    return out
+
+
+# wyszukiwanie
+
+def _search_sql(root_id: Optional[int], after: bool) -> str:
+    sub = ""
+    sub_cond = ""
+    if root_id is not None:
+        sub = """
+            sub AS (
+                SELECT id, ARRAY[id] AS path FROM tasks WHERE id = %(root_id)s
+                UNION ALL
+                SELECT c.id, sub.path || c.id FROM tasks c JOIN sub ON c.parent_id = sub.id
+                WHERE NOT c.id = ANY(sub.path)
+            ),"""
+        sub_cond = "AND t.id IN (SELECT id FROM sub)"
+    after_cond = "WHERE r.rank < %(rank)s OR (r.rank = %(rank)s AND r.id > %(id)s)" if after else ""
+    return f"""
+        WITH RECURSIVE {sub}
+        q AS (SELECT websearch_to_tsquery('{FTS_CONFIG}'::regconfig, %(q)s) AS q)
+        SELECT * FROM (
+            SELECT {_task_cols("t.")}, ts_rank(t.search_tsv, q.q)::float8 AS rank
+            FROM tasks t, q
+            WHERE t.search_tsv @@ q.q {sub_cond}
+        ) r
+        {after_cond}
+        ORDER BY r.rank DESC, r.id
+        LIMIT %(limit)s
+    """
+
+def _search_params(query: str, root_id: Optional[int], limit: int, cursor: Optional[str]) -> Dict[str, Any]:
+    if not query or not query.strip():
+        raise ValueError("Puste zapytanie wyszukiwania")
+    params: Dict[str, Any] = {"q": query, "root_id": root_id, "limit": limit + 1}
+    if cursor:
+        try:
+            rank, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            params.update(rank=float(rank), id=int(last_id))
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Niepoprawny kursor: '{cursor}'") from e
+    return params
+
+def _search_page(rows: List[Dict[str, Any]], limit: int) -> Tuple[List[Tuple[Task, float]], Optional[str]]:
+    results = [(Task.from_row(r), r["rank"]) for r in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        task, rank = results[-1]
+        next_cursor = base64.urlsafe_b64encode(json.dumps([rank, task.id]).encode()).decode()
+    return results, next_cursor
+
+def search_tasks(conn, query: str, root_id: Optional[int] = None, limit: int = 20,
+                 cursor: Optional[str] = None) -> Tuple[List[Tuple[Task, float]], Optional[str]]:
+    """Wyszukiwanie pełnotekstowe po tytule i opisie (indeks GIN na search_tsv).
+
+    Zapytanie w składni websearch ("a b", "a OR b", "-c", "\"fraza\""). Wyniki są
+    posortowane po trafności i stronicowane kursorem; root_id zawęża do poddrzewa.
+    Zwraca ([(zadanie, ranking)], kursor następnej strony lub None).
+    """
+    with conn.cursor() as cur:
+        cur.execute(_search_sql(root_id, bool(cursor)), _search_params(query, root_id, limit, cursor))
+        rows = cur.fetchall()
+    return _search_page(rows, limit)
+
+
+# import / eksport
+
+IMPORT_BATCH_SIZE = 5000
+
+_EXPORT_COLUMNS = TASK_FIELDS
+_IMPORT_COLUMNS = ("src_id", "src_parent_id") + _EXPORT_COLUMNS[2:]
+
+def _detect_format(path: str, fmt: Optional[str]) -> str:
+    fmt = (fmt or os.path.splitext(path)[1].lstrip(".")).lower()
+    if fmt == "json":
+        fmt = "jsonl"
+    if fmt not in ("jsonl", "csv"):
+        raise ValueError(f"Nieobsługiwany format pliku: '{fmt}' (dozwolone: jsonl, csv)")
+    return fmt
+
+def _opt_int(value: Any) -> Optional[int]:
+    return None if value in (None, "") else int(value)
+
+def _import_row(rec: Dict[str, Any], ts: datetime) -> Tuple:
+    title = rec.get("title")
+    if not title:
+        raise ValueError(f"Brak tytułu w rekordzie importu: {rec}")
+    return (
+        _opt_int(rec.get("id")),
+        _opt_int(rec.get("parent_id")),
+        title,
+        rec.get("description") or "",
+        parse_when(rec.get("due_at")),
+        _opt_int(rec.get("estimate_min")) or 0,
+        TaskPriority(_opt_int(rec.get("priority")) or TaskPriority.NORMAL).value,
+        TaskStatus(rec.get("status") or TaskStatus.TODO).value,
+        parse_when(rec.get("created_at")) or ts,
+        parse_when(rec.get("updated_at")) or ts,
+    )
+
+def _iter_records(f, fmt: str):
+    if fmt == "csv":
+        yield from csv.DictReader(f)
+        return
+    for line in f:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+def import_tasks(conn, path: str, fmt: Optional[str] = None, batch_size: int = IMPORT_BATCH_SIZE) -> Dict[str, int]:
+    """Masowy import zadań z JSONL/CSV przez COPY, w jednej transakcji.
+
+    Rekordy są strumieniowane paczkami po batch_size do tymczasowej tabeli, więc zużycie
+    pamięci nie zależy od rozmiaru pliku. Pola id/parent_id z pliku są mapowane na nowe id,
+    dzięki czemu relacje rodzic-dziecko zostają zachowane.
+    """
+    fmt = _detect_format(path, fmt)
+    ts = now_dt()
+    total = 0
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DROP TABLE IF EXISTS pg_temp.tasks_import")
+            cur.execute(
+                """
+                CREATE TEMP TABLE tasks_import (
+                    src_id BIGINT,
+                    src_parent_id BIGINT,
+                    title TEXT NOT NULL,
+                    description TEXT,
+                    due_at TIMESTAMP,
+                    estimate_min INTEGER,
+                    priority INTEGER,
+                    status TEXT,
+                    created_at TIMESTAMP,
+                    updated_at TIMESTAMP,
+                    new_id BIGINT
+                ) ON COMMIT DROP
+                """
+            )
+            copy_sql = f"COPY tasks_import ({','.join(_IMPORT_COLUMNS)}) FROM STDIN"
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                records = _iter_records(f, fmt)
+                while True:
+                    batch = [_import_row(r, ts) for r in islice(records, batch_size)]
+                    if not batch:
+                        break
+                    with cur.copy(copy_sql) as copy:
+                        for row in batch:
+                            copy.write_row(row)
+                    total += len(batch)
+
+            cur.execute("CREATE INDEX ON tasks_import (src_id)")
+            cur.execute("ANALYZE tasks_import")
+            cur.execute(
+                """
+                SELECT count(*) AS n FROM tasks_import i
+                WHERE i.src_parent_id IS NOT NULL
+                  AND NOT EXISTS (SELECT 1 FROM tasks_import p WHERE p.src_id = i.src_parent_id)
+                """
+            )
+            orphans = cur.fetchone()["n"]
+            if orphans:
+                raise ValueError(f"{orphans} rekord(ów) wskazuje parent_id spoza importowanego pliku")
+            # powtórzone id zwielokrotniłoby dzieci w złączeniu p.src_id = i.src_parent_id
+            cur.execute(
+                """
+                SELECT src_id FROM tasks_import WHERE src_id IS NOT NULL
+                GROUP BY src_id HAVING count(*) > 1 ORDER BY src_id LIMIT 10
+                """
+            )
+            dups = [r["src_id"] for r in cur.fetchall()]
+            if dups:
+                raise ValueError(f"Powtórzone id w importowanym pliku: {', '.join(map(str, dups))}")
+            cur.execute("UPDATE tasks_import SET new_id = nextval(pg_get_serial_sequence('tasks', 'id'))")
+            # ograniczenia FK są sprawdzane na końcu polecenia, więc kolejność rodzic/dziecko nie ma znaczenia
+            cur.execute(
+                """
+                INSERT INTO tasks(id,parent_id,title,description,due_at,estimate_min,priority,status,created_at,updated_at)
+                SELECT i.new_id, p.new_id, i.title, i.description, i.due_at, i.estimate_min,
+                       i.priority, i.status, i.created_at, i.updated_at
+                FROM tasks_import i
+                LEFT JOIN tasks_import p ON p.src_id = i.src_parent_id
+                """
+            )
+        _cache_invalidate(conn, everything=True)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        _cache_flush(conn)
+    return {"imported": total}
+
+def export_tasks(conn, path: str, fmt: Optional[str] = None) -> Dict[str, int]:
+    """Strumieniowy eksport wszystkich zadań do JSONL/CSV przez COPY TO STDOUT."""
+    fmt = _detect_format(path, fmt)
+    cols = ",".join(_EXPORT_COLUMNS)
+    total = 0
+    with conn.cursor() as cur:
+        if fmt == "csv":
+            sql = f"COPY (SELECT {cols} FROM tasks ORDER BY id) TO STDOUT WITH (FORMAT csv)"
+            with open(path, "wb") as f, cur.copy(sql) as copy:
+                f.write((cols + "\n").encode("utf-8"))
+                for chunk in copy:
+                    f.write(chunk)
+            total = cur.rowcount
+        else:
+            sql = f"COPY (SELECT row_to_json(t)::text FROM (SELECT {cols} FROM tasks ORDER BY id) t) TO STDOUT"
+            with open(path, "w", encoding="utf-8") as f, cur.copy(sql) as copy:
+                copy.set_types(["text"])
+                for (line,) in copy.rows():
+                    f.write(line + "\n")
+                    total += 1
+    conn.commit()
+    return {"exported": total}
+
+
+# dziennik zmian
+
+CHANGES_LIMIT = 1000
+
+_CHANGES_SQL = f"""
+    WITH batch AS (
+        SELECT seq, task_id, op FROM task_changes
+        WHERE seq > %(since)s
+        ORDER BY seq
+        LIMIT %(limit)s
+    ),
+    latest AS (
+        SELECT DISTINCT ON (task_id) seq, task_id, op FROM batch
+        ORDER BY task_id, seq DESC
+    )
+    SELECT l.seq AS change_seq, l.task_id, l.op, (SELECT count(*) FROM batch) AS batch_size,
+           (SELECT max(seq) FROM batch) AS batch_max, {_task_cols("t.")}
+    FROM latest l
+    LEFT JOIN tasks t ON t.id = l.task_id
+    ORDER BY l.seq
+"""
+
+def list_changes(conn, since: int = 0, limit: int = CHANGES_LIMIT) -> Dict[str, Any]:
+    """Zmiany zadań po numerze `since` (kolejne wpisy dziennika, najwyżej `limit`).
+
+    Kilka zmian jednego zadania jest zwijanych do ostatniej; zwracany jest aktualny stan
+    zadania albo tombstone {"deleted": True}, jeśli zadanie już nie istnieje.
+    Wynik "since" należy podać w następnym wywołaniu, has_more mówi, czy są kolejne wpisy.
+    """
     with conn.cursor() as cur:
-        cur.execute(query, params)
+        cur.execute(_CHANGES_SQL, {"since": since, "limit": limit})
         rows = cur.fetchall()
-    return [Task.from_row(r) for r in rows]
+    conn.commit()
+    return _changes_page(rows, since, limit)
+
+def _changes_page(rows: List[Dict[str, Any]], since: int, limit: int) -> Dict[str, Any]:
+    changes = []
+    for r in rows:
+        if r["op"] == "delete" or r["id"] is None:
+            changes.append({"seq": r["change_seq"], "id": r["task_id"], "op": "delete", "deleted": True})
+        else:
+            changes.append({"seq": r["change_seq"], "id": r["task_id"], "op": r["op"], "deleted": False,
+                            "task": task_to_dict(Task.from_row(r))})
+    return {
+        "since": rows[0]["batch_max"] if rows else since,
+        "has_more": bool(rows) and rows[0]["batch_size"] >= limit,
+        "changes": changes,
+    }
+
+def prune_changes(conn, before_seq: int) -> int:
+    """Usuwa wpisy dziennika starsze niż before_seq (gdy wszyscy klienci je już odczytali)."""
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM task_changes WHERE seq < %s", (before_seq,))
+        n = cur.rowcount
+    conn.commit()
+    return n
+
+
+# planowanie
+
+DEFAULT_DAILY_CAPACITY = 480
+
+_DAY_MIN = 24 * 60
+_MINUTE = timedelta(minutes=1)
+# "brak terminu" jako liczba całkowita, żeby dało się go spakować w klucz kopca
+_NO_DUE = 1 << 62
+_KEY_BIAS = 1 << 63
+_ID_MASK = (1 << 64) - 1
+
+def compute_plan(tasks: List[Task], daily_capacity: int = DEFAULT_DAILY_CAPACITY,
+                 start: Optional[datetime] = None) -> Dict[str, Any]:
+    """Układa wykonalny harmonogram dla niezakończonych zadań, O(n log n).
+
+    - estymaty podzadań są sumowane w górę drzewa (rollup_min),
+    - termin rodzica obowiązuje też jego podzadania, a priorytet rodzica jest dziedziczony,
+    - rodzic trafia do planu dopiero po wszystkich swoich podzadaniach,
+    - spośród gotowych zadań pierwsze idzie to o najwyższym priorytecie i najmniejszym zapasie
+      (najpóźniejszy możliwy start = termin - rollup_min).
+    """
+    if not 0 < daily_capacity <= _DAY_MIN:
+        # więcej minut pracy niż w dobie cofałoby czasy zakończenia w kalendarzu
+        raise ValueError(f"Dzienna przepustowość musi być w zakresie 1..{_DAY_MIN} minut")
+    start = start or now_dt()
+    done = TaskStatus.DONE
+    by_id = {t.id: t for t in tasks if t.status is not done}
+    # gęste indeksy zamiast słowników po id; kolejność indeksów = kolejność id,
+    # więc remisy w kopcu rozstrzyga id tak jak dotąd
+    ids = sorted(by_id)
+    n = len(ids)
+    live = [by_id[tid] for tid in ids]
+    index = {tid: i for i, tid in enumerate(ids)}
+    par = [index.get(t.parent_id, -1) for t in live]
+    kids: List[List[int]] = [[] for _ in range(n)]
+    order: List[int] = []
+    for i, p in enumerate(par):
+        (kids[p] if p >= 0 else order).append(i)
+
+    # kolejność od korzeni w dół (BFS: lista rośnie w trakcie iteracji) - węzły w cyklach
+    # nie są osiągalne i zostają pominięte
+    for i in order:
+        order.extend(kids[i])
+
+    # cały plan liczony w całkowitych minutach od startu kalendarza, daty i słowniki wyniku
+    # powstają raz, na końcu; rodzic jest przed dziećmi, więc termin i priorytet dziedziczą się w jednym przejściu
+    due = [_NO_DUE] * n
+    prio = [0] * n
+    est = [0] * n
+    for i in order:
+        t = live[i]
+        if t.due_at is not None:
+            d = t.due_at - start
+            di = d.days * _DAY_MIN + d.seconds // 60
+        else:
+            di = _NO_DUE
+        pi = t.priority.value
+        p = par[i]
+        if p >= 0:
+            if due[p] < di:
+                di = due[p]
+            if prio[p] > pi:
+                pi = prio[p]
+        due[i] = di
+        prio[i] = pi
+        est[i] = t.estimate_min or 0
+
+    # dzieci są głębiej w BFS, więc w odwrotnej kolejności ich sumy są gotowe przed rodzicem
+    rollup = est[:]
+    for i in reversed(order):
+        p = par[i]
+        if p >= 0:
+            rollup[p] += rollup[i]
+
+    # klucz kopca (-priorytet, najpóźniejszy możliwy start = termin - rollup_min, indeks) spakowany
+    # w jedną liczbę całkowitą - porównania int są kilka razy tańsze niż krotek;
+    # zadania bez terminu są sobie równe (rozstrzyga id)
+    def key(i: int) -> int:
+        latest = due[i] - rollup[i] if due[i] != _NO_DUE else _NO_DUE
+        return ((3 - prio[i]) << 128) | ((latest + _KEY_BIAS) << 64) | i
+
+    pending = [len(k) for k in kids]
+    heap = [key(i) for i in order if not pending[i]]
+    heapq.heapify(heap)
+
+    planned: List[int] = []
+    finish_at: List[int] = []
+    elapsed = 0
+    pop, push = heapq.heappop, heapq.heappush
+    while heap:
+        i = pop(heap) & _ID_MASK
+        elapsed += est[i]
+        if elapsed > 0:
+            day = (elapsed - 1) // daily_capacity
+            finish_at.append(day * _DAY_MIN + elapsed - day * daily_capacity)
+        else:
+            finish_at.append(0)
+        planned.append(i)
+        p = par[i]
+        if p >= 0:
+            pending[p] -= 1
+            if not pending[p]:
+                push(heap, key(p))
+
+    # daty tylko dla różnych minut - wiele zadań dzieli koniec (estymata 0) albo termin (dziedziczony)
+    at = {m: start + _MINUTE * m for m in set(finish_at)}
+    at[0] = start
+    due_at = {d: start + _MINUTE * d if d != _NO_DUE else None for d in set(due)}
+
+    schedule: List[Dict[str, Any]] = []
+    late: List[int] = []
+    begin = 0
+    for i, fin in zip(planned, finish_at):
+        t = live[i]
+        di = due[i]
+        if di != _NO_DUE:
+            # zapas w minutach kalendarzowych między końcem pracy a terminem
+            slack = di - fin
+            is_late = slack < 0
+            if is_late:
+                late.append(t.id)
+        else:
+            slack, is_late = None, False
+        schedule.append({
+            "id": t.id,
+            "parent_id": t.parent_id if par[i] >= 0 else None,
+            "title": t.title,
+            "priority": prio[i],
+            "estimate_min": t.estimate_min,
+            "rollup_min": rollup[i],
+            "start": at[begin],
+            "finish": at[fin],
+            "due_at": due_at[di],
+            "slack_min": slack,
+            "late": is_late,
+        })
+        begin = fin
+
+    return {
+        "start": start,
+        "finish": at[begin],
+        "daily_capacity": daily_capacity,
+        "total_min": elapsed,
+        "days": -(-elapsed // daily_capacity),
+        "late": late,
+        "skipped": n - len(order),
+        "schedule": schedule,
+    }
+
+_PLAN_SQL = f"SELECT {_task_cols()} FROM tasks WHERE status <> 'done'"
+
+def _plan_query(root_id: Optional[int]) -> Tuple[str, Optional[Dict[str, Any]]]:
+    if root_id is None:
+        # compute_plan sam buduje hierarchię - bez rekurencyjnego CTE i sortowania po ścieżce
+        return _PLAN_SQL, None
+    return _tree_sql(root_id), {"root_id": root_id, "max_depth": None}
+
+def plan_schedule(conn, daily_capacity: int = DEFAULT_DAILY_CAPACITY,
+                  start: Optional[datetime] = None, root_id: Optional[int] = None) -> Dict[str, Any]:
+    """Harmonogram dla całego drzewa (lub poddrzewa root_id) po jednym pobraniu wszystkich zadań."""
+    with conn.cursor(row_factory=task_row) as cur:
+        cur.execute(*_plan_query(root_id))
+        tasks = cur.fetchall()
+    if root_id is not None and not tasks:
+        raise ValueError(f"Brak zadania {root_id}")
+    return compute_plan(tasks, daily_capacity, start)
 
 
 # function call
 
-def chat_call(payload: Dict[str, Any], db_url: Optional[str] = None) -> Dict[str, Any]:
-    """Obsługa menedżera zadań przez payload JSON."""
+def _add_args(p: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "title": p["title"],
+        "description": p.get("description", ""),
+        "due_at": parse_when(p.get("due_at")),
+        "estimate_min": p.get("estimate_min", 0),
+        "priority": TaskPriority(p.get("priority", TaskPriority.NORMAL)),
+        "parent_id": p.get("parent_id"),
+    }
+
+def _update_fields(p: Dict[str, Any]) -> Dict[str, Any]:
+    fields = dict(p.get("fields", {}))
+    if 'due_at' in fields:
+        fields['due_at'] = parse_when(fields['due_at'])
+    return fields
+
+def _list_args(p: Dict[str, Any]) -> Dict[str, Any]:
+    def multi(v):
+        return v.split(",") if isinstance(v, str) and "," in v else v
+    priority = multi(p.get("priority"))
+    if isinstance(priority, list):
+        priority = [int(v) for v in priority]
+    return {
+        "parent_id": p.get("parent_id"),
+        "any_parent": p.get("any_parent", False),
+        "status": multi(p.get("status")),
+        "priority": priority,
+        "due_from": parse_when(p.get("due_from")),
+        "due_to": parse_when(p.get("due_to")),
+        "title": p.get("title"),
+        "limit": p.get("limit"),
+        "cursor": p.get("cursor"),
+    }
+
+def _plain_list(args: Dict[str, Any]) -> bool:
+    """Czy to zwykłe listowanie jednego poziomu (bez filtrów i paginacji) - takie idzie przez cache."""
+    return not any(v for k, v in args.items() if k != "parent_id")
+
+def _plan_args(p: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "daily_capacity": p.get("capacity", DEFAULT_DAILY_CAPACITY),
+        "start": parse_when(p.get("start")),
+        "root_id": p.get("root_id"),
+    }
+
+BATCH_COMMANDS = {"add", "update", "delete", "show", "list", "tree"}
+_BATCH_WRITES = {"add", "update", "delete"}
+# błędy pojedynczej operacji batch, które trafiają do wyników zamiast przerywać całe wywołanie
+BATCH_ERRORS = (ValueError, KeyError, psycopg.Error)
+
+def _batch_op(op: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """Komenda operacji batch i argumenty handlera - zapisy bez commita, commituje cała paczka."""
+    cmd = op.get("command")
+    if cmd not in BATCH_COMMANDS:
+        raise ValueError(f"Komenda '{cmd}' niedozwolona w batch")
+    return cmd, ({"commit": False} if cmd in _BATCH_WRITES else {})
+
+def _batch_response(ops: List[Dict[str, Any]], results: List[Dict[str, Any]],
+                    atomic: bool, failed: Optional[int] = None) -> Dict[str, Any]:
+    """Wynik batch (wspólny dla API synchronicznego i asynchronicznego)."""
+    if not atomic:
+        errors = sum(1 for r in results if r["status"] == "error")
+        return {"status": "ok", "errors": errors, "results": results}
+    if failed is None:
+        return {"status": "ok", "results": results}
+    for r in results[:failed]:
+        r["status"] = "rolled_back"
+    results.extend({"status": "skipped"} for _ in ops[failed + 1:])
+    return {"status": "error", "error": results[failed]["error"],
+            "failed_index": failed, "results": results}
+
+def chat_call(payload: Dict[str, Any], db_url: Optional[str] = None, pooled: bool = False) -> Dict[str, Any]:
+    """Obsługa menedżera zadań przez payload JSON.
+
+    pooled=True pobiera połączenie z długo żyjącej puli zamiast otwierać nowe.
+    """
     
-    def handle_add(conn, p):
-        due = parse_when(p.get("due_at"))
-        priority = TaskPriority(p.get("priority", TaskPriority.NORMAL))
-        new_id = add_task(conn,
-                          title=p["title"],
-                          description=p.get("description", ""),
-                          due_at=due,
-                          estimate_min=p.get("estimate_min", 0),
-                          priority=priority,
-                          parent_id=p.get("parent_id"))
+    def handle_add(conn, p, commit=True):
+        new_id = add_task(conn, commit=commit, **_add_args(p))
         return {"status": "ok", "id": new_id}
 
-    def handle_update(conn, p):
-        fields = p.get("fields", {})
-        if 'due_at' in fields:
-            fields['due_at'] = parse_when(fields['due_at'])
-        update_task(conn, p["id"], **fields)
+    def handle_update(conn, p, commit=True):
+        update_task(conn, p["id"], commit=commit, **_update_fields(p))
         return {"status": "ok"}
 
-    def handle_delete(conn, p):
-        delete_task(conn, p["id"])
+    def handle_delete(conn, p, commit=True):
+        delete_task(conn, p["id"], commit=commit)
         return {"status": "ok"}
 
     def handle_show(conn, p):
         task = get_task(conn, p["id"])
-        return {"status": "ok", "task": asdict(task)}
+        with _phase("serialize"):
+            return {"status": "ok", "task": task_to_dict(task)}
 
     def handle_list(conn, p):
-        tasks = list_tasks(conn, p.get("parent_id"))
-        return {"status": "ok", "tasks": [asdict(t) for t in tasks]}
+        args = _list_args(p)
+        if _plain_list(args):
+            tasks, next_cursor = list_tasks(conn, args["parent_id"]), None
+        else:
+            tasks, next_cursor = query_tasks(conn, **args)
+        with _phase("serialize"):
+            return {"status": "ok", "tasks": [task_to_dict(t) for t in tasks], "next_cursor": next_cursor}
+
+    def handle_tree(conn, p):
+        nodes = list_tree(conn, p.get("root_id"), p.get("max_depth"))
+        with _phase("serialize"):
+            return {"status": "ok", "tree": tree_to_dicts(nodes)}
+
+    def handle_search(conn, p):
+        results, next_cursor = search_tasks(conn, p["q"], p.get("root_id"), p.get("limit", 20), p.get("cursor"))
+        return {"status": "ok",
+                "results": [{**task_to_dict(t), "rank": rank} for t, rank in results],
+                "next_cursor": next_cursor}
+
+    def handle_changes(conn, p):
+        return {"status": "ok", **list_changes(conn, p.get("since", 0), p.get("limit", CHANGES_LIMIT))}
+
+    def handle_import(conn, p):
+        stats = import_tasks(conn, p["path"], p.get("format"), p.get("batch_size", IMPORT_BATCH_SIZE))
+        return {"status": "ok", **stats}
+
+    def handle_export(conn, p):
+        stats = export_tasks(conn, p["path"], p.get("format"))
+        return {"status": "ok", **stats}
+
+    def handle_plan(conn, p):
+        return {"status": "ok", **plan_schedule(conn, **_plan_args(p))}
+
+    def handle_batch(conn, p):
+        """Wiele operacji na jednym połączeniu i w jednej transakcji.
+
+        atomic=True (domyślnie): wszystko albo nic - pierwszy błąd wycofuje całą paczkę.
+        atomic=False: każda operacja we własnym savepoincie, błędne są wycofywane niezależnie.
+        """
+        ops = p.get("ops") or []
+        atomic = p.get("atomic", True)
+        results: List[Dict[str, Any]] = []
+
+        failed = None
+
+        def run_op(op):
+            cmd, kwargs = _batch_op(op)
+            return commands[cmd](conn, op, **kwargs)
+
+        try:
+            with conn.transaction():
+                for i, op in enumerate(ops):
+                    try:
+                        if atomic:
+                            results.append(run_op(op))
+                        else:
+                            with conn.transaction():
+                                results.append(run_op(op))
+                    except BATCH_ERRORS as e:
+                        results.append({"status": "error", "error": str(e)})
+                        if atomic:
+                            failed = i
+                            raise psycopg.Rollback()
+        finally:
+            _cache_flush(conn)
+        return _batch_response(ops, results, atomic, failed)
 
     commands = {
         "add": handle_add,
@@ -227,18 +1677,36 @@ def chat_call(payload: Dict[str, Any], db_url: Optional[str] = None) -> Dict[str
         "delete": handle_delete,
         "show": handle_show,
         "list": handle_list,
+        "tree": handle_tree,
+        "search": handle_search,
+        "import": handle_import,
+        "export": handle_export,
+        "batch": handle_batch,
+        "plan": handle_plan,
+        "changes": handle_changes,
     }
 
     cmd = payload.get("command")
+    if cmd == "stats":
+        return {"status": "ok", "pool": pool_stats(db_url), "cache": cache_stats()}
+    if cmd == "metrics":
+        return {"status": "ok", "metrics": metrics_snapshot()}
     if cmd not in commands:
         return {"status": "error", "error": "Nieznana komenda"}
 
+    token = _CURRENT_COMMAND.set(cmd)
     try:
-        with connect(db_url) as conn:
-            init_db(conn)
-            return commands[cmd](conn, payload)
-    except (ValueError, KeyError, psycopg.Error) as e:
+        with _phase("total"), ExitStack() as stack:
+            with _phase("connect"):
+                conn = stack.enter_context(get_pool(db_url).connection() if pooled else connect(db_url))
+            with _phase("init_db"):
+                ensure_schema(conn, db_url)
+            with _phase("handler"):
+                return commands[cmd](conn, payload)
+    except (ValueError, KeyError, OSError, psycopg.Error) as e:
         return {"status": "error", "error": str(e)}
+    finally:
+        _CURRENT_COMMAND.reset(token)
         
 
 # chat tekstowy
@@ -269,10 +1737,25 @@ def format_task(task: Dict[str, Any], indent: str = "") -> str:
         f"{indent}  Prio: {prio}, Termin: {due}, Est: {task['estimate_min']}min{desc}"
     )
 
+def format_tree(nodes: List[Dict[str, Any]], skip_depth: int = 0) -> str:
+    """Formatuje zagnieżdżone drzewo zadań, wcinając podzadania wg głębokości."""
+    lines = []
+    stack = list(reversed(nodes))
+    while stack:
+        task = stack.pop()
+        depth = task.get("depth", 0) - skip_depth
+        if depth >= 0:
+            indent = "  " * (depth - 1) + "  -> " if depth else ""
+            lines.append(format_task(task, indent=indent))
+        stack.extend(reversed(task.get("children", [])))
+    return "\n".join(lines)
+
+LIST_FILTER_KEYS = {"status", "priority", "due_from", "due_to", "title", "any_parent", "limit", "cursor"}
+
 def main_chat():
     """Główna pętla czatu tekstowego."""
     print("Witaj w Menedżerze Zadań!")
-    print("Dostępne komendy: add, list, show, update, delete, help, exit")
+    print("Dostępne komendy: add, list, tree, search, show, update, delete, import, export, changes, plan, stats, metrics, help, exit")
     print("Przykład: add title:'Nowe zadanie' description:'Opis' priority:3 due_at:'2024-12-31'")
     
     while True:
@@ -287,9 +1770,19 @@ def main_chat():
                 print("  add title:'Zrobić zakupy' description:'Mleko, chleb' priority:3")
                 print("  list")
                 print("  list parent_id:1")
+                print("  list status:todo priority:3 due_to:'2024-12-31' limit:20")
+                print("  list any_parent:true title:'zakupy'")
+                print("  tree root_id:1 max_depth:2")
+                print("  search q:'zakupy mleko' root_id:1 limit:10")
                 print("  show id:1")
                 print("  update id:1 status:done")
                 print("  delete id:1")
+                print("  import path:'zadania.jsonl'")
+                print("  export path:'zadania.csv'")
+                print("  changes since:0 limit:100")
+                print("  plan capacity:360 start:'2024-12-01 09:00'")
+                print("  stats")
+                print("  metrics")
                 continue
 
             parts = shlex.split(line)
@@ -298,8 +1791,15 @@ def main_chat():
             
             payload = {"command": command}
             
-            # Specjalna obsługa dla 'update'
-            if command == 'update':
+            # Specjalna obsługa dla 'list' i 'update'
+            if command == 'list' and LIST_FILTER_KEYS & args.keys():
+                payload.update(args)
+            elif command == 'list':
+                # całe poddrzewo jednym zapytaniem zamiast osobnego 'list' dla każdego zadania
+                payload['command'] = 'tree'
+                payload['root_id'] = args.pop('parent_id', None)
+                payload.update(args)
+            elif command == 'update':
                 if 'id' not in args:
                     raise ValueError("Brak 'id' dla komendy update")
                 payload['id'] = args.pop('id')
@@ -307,7 +1807,7 @@ def main_chat():
             else:
                 payload.update(args)
 
-            result = chat_call(payload)
+            result = chat_call(payload, pooled=True)
 
             if result.get("status") == "error":
                 print(f"Błąd: {result.get('error')}")
@@ -317,18 +1817,50 @@ def main_chat():
                     print(f"Dodano zadanie o ID: {result['id']}")
                 elif command == 'show':
                     print(format_task(result['task']))
-                elif command == 'list':
-                    tasks = result.get('tasks', [])
+                elif command == 'search':
+                    if not result['results']:
+                        print("Brak wyników.")
+                    for task in result['results']:
+                        print(format_task(task) + f"  (trafność: {task['rank']:.3f})")
+                    if result.get('next_cursor'):
+                        print(f"Następna strona: search ... cursor:{result['next_cursor']}")
+                elif command == 'changes':
+                    for c in result['changes']:
+                        if c['deleted']:
+                            print(f"#{c['seq']} [{c['id']}] usunięte")
+                        else:
+                            print(f"#{c['seq']} {c['op']}: " + format_task(c['task']))
+                    more = " (są kolejne)" if result['has_more'] else ""
+                    print(f"Następne wywołanie: changes since:{result['since']}{more}")
+                elif command == 'plan':
+                    for e in result['schedule']:
+                        flag = " SPÓŹNIONE" if e['late'] else ""
+                        print(f"[{e['id']}] {e['title']}: {e['start']:%Y-%m-%d %H:%M} -> "
+                              f"{e['finish']:%Y-%m-%d %H:%M} (termin: {e['due_at'] or 'brak'}){flag}")
+                    print(f"Razem: {result['total_min']} min, dni: {result['days']}, "
+                          f"spóźnionych: {len(result['late'])}")
+                elif command == 'import':
+                    print(f"Zaimportowano zadań: {result['imported']}")
+                elif command == 'export':
+                    print(f"Wyeksportowano zadań: {result['exported']}")
+                elif command == 'metrics':
+                    print(json.dumps(result['metrics'], indent=2))
+                elif command == 'stats':
+                    print(json.dumps({"pool": result['pool'], "cache": result['cache']}))
+                elif command == 'list' and 'tasks' in result:
+                    tasks = result['tasks']
                     if not tasks:
                         print("Brak zadań do wyświetlenia.")
                     for task in tasks:
                         print(format_task(task))
-                        # Proste wyświetlanie podzadań
-                        sub_tasks_payload = {"command": "list", "parent_id": task['id']}
-                        sub_result = chat_call(sub_tasks_payload)
-                        if sub_result.get('status') == 'ok':
-                            for sub_task in sub_result.get('tasks', []):
-                                print(format_task(sub_task, indent="  -> "))
+                    if result.get('next_cursor'):
+                        print(f"Następna strona: list ... cursor:{result['next_cursor']}")
+                elif command in ('list', 'tree'):
+                    tree = result.get('tree', [])
+                    # 'list parent_id:X' pokazuje dzieci X, a nie samo X
+                    skip = 1 if command == 'list' and payload.get('root_id') is not None else 0
+                    text = format_tree(tree, skip_depth=skip)
+                    print(text if text else "Brak zadań do wyświetlenia.")
 
         except (KeyboardInterrupt, EOFError):
             print("\nDo widzenia!")
@@ -342,4 +1874,8 @@ if __name__ == "__main__":
         print("UWAGA: Zmienna DATABASE_URL nie jest poprawnie ustawiona w pliku .env.")
         print("Proszę, zaktualizuj plik .env o prawidłowe dane dostępowe do bazy danych.")
     else:
+        if os.getenv("TASKS_CACHE"):
+            enable_cache()
+        if os.getenv("TASKS_METRICS"):
+            enable_metrics()
         main_chat()